@@ -1,22 +1,47 @@
 # Requires Tor running on localhost:9050
 # - Async crawling using httpx
 # - Rotating Random user-agents and headers
+# -     Precomputed header profiles cached on disk, one consistent profile per circuit identity
 # - Rotating proxies with health/validity checks
+# -     Async health checks, latency scoring, ejection and background re-probing
+# -     Optional public proxy lists, harvested concurrently from several sources and cached with a TTL
 # - Gaussian delay strategy
+# -     Applied per host (jittered gaps + token bucket), other hosts are crawled in the meantime
 # - Selenium integration for dynamic content and real browser behavior
 # ADDITIONAL FEATURES:
 # - Async to reduce latency/time
-# - Circuit rotation for Tor
-# - Enhanced data extraction with BeautifulSoup
-# - JSON output to view results
+# - Bounded worker pool with global and per-host concurrency caps
+# - Pooled keep-alive httpx clients per proxy/circuit
+# -     Optional HTTP/2 multiplexing and brotli/zstd compression
+# -     Streamed downloads with early Content-Type/Content-Length rejection and a per-response byte budget
+# -     Charset resolved from headers/BOM/<meta> (cached per host) and handed to the parser with the raw bytes
+# - Parallel isolated Tor circuits (IsolateSOCKSAuth) and optional extra local tor instances
+# - Circuit rotation for Tor over one persistent, non-blocking control connection
+# - Enhanced data extraction with BeautifulSoup (single pass, lxml backend when installed)
+# - HTML parsing offloaded to a process pool so fetches never stall
+# - Results streamed to JSON Lines (or stdout) as they are produced
+# -     Or to compressed Parquet segments with a URL/domain index, for column/row selective reads
 # - Improved error handling and retry logic
+# -     Errors classified (connect, timeout, 5xx, 429/Retry-After...), retried with jittered backoff on another circuit
 # - Modular design for easy extension and maintenance
+# -     Optional backends (Selenium, stem, fake_useragent) are imported on first use, httpx runs start fast
+# - Recursive crawling with canonicalised URLs, Bloom filter dedup and depth/priority scheduling
+# -     Near-duplicate pages (SimHash of the visible text) skipped before extraction and storage
+# - Checkpoint/resume of crawl state in SQLite (WAL, batched commits)
+# - Compressed on-disk response cache with ETag/Last-Modified revalidation
 # - Support for both Selenium and httpx based crawling
+# -     Hybrid mode: httpx first, Selenium only for client-rendered pages (remembered per host)
+# -     Warm Selenium browser pool, recycled after N pages or on a memory threshold
+# -     Lean page loads: readiness waits, blocked images/fonts/CSS/media, page-load strategy and timeouts
 # -     Benefits both static and dynamic content scraping
 # - Enhanced logging/debugging 
+# -     Per-stage timing histograms, per proxy/circuit counters, Prometheus endpoint or periodic stats dump
+# -     Optional sampling profiler for the event loop (collapsed stacks for flame graphs)
 
 # ENSURE PACKAGES EXIST!!!
-# py -m pip install selenium beautifulsoup4 requests numpy stem fake_useragent 
+# py -m pip install selenium beautifulsoup4 requests stem fake_useragent 
+# (selenium, stem and fake_useragent are only needed by the features that use them)
+# py -m pip install pyarrow   (only for OUTPUT_SINK = "parquet")
 # py -m pip install --upgrade "httpx[socks]"
 
 # NOTES:
@@ -25,47 +50,135 @@
 
 import asyncio
 import httpx
-import random
-import requests
+import os
+import shutil
 import socket
 import time
-import json
+from collections import defaultdict
+from contextlib import AsyncExitStack, asynccontextmanager
 from typing import List, Dict, Optional
-from bs4 import BeautifulSoup
 from urllib.parse import urlparse
-from fake_useragent import UserAgent
+from client_pool import ClientPool, new_client
+from extraction import extract_page
+from parse_pool import ParsePool
+from sinks import ResultSink, create_sink
 #print("[DEBUG] Using httpx version:", httpx.__version__)
 #print("[DEBUG] httpx module loaded from:", httpx.__file__)
 
 #Circuit rotation
-from stem import Signal
-from stem.control import Controller
-
-#Selenium imports for browser automation
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import WebDriverException
-import numpy as np
+from tor_control import TorController
+from circuits import CircuitPool, TorInstances
+from proxy_manager import ProxyManager, proxy_key
+from frontier import Frontier
+from state_store import StateStore
+from response_cache import ResponseCache
+from browser_pool import BrowserPool
+from render_policy import RenderPolicy
+from retry import CONNECT, RENDER, FetchError, RetryPolicy, classify
+from politeness import PolitenessScheduler
+from metrics import METRICS, MetricsExporter, RequestTrace, SamplingProfiler
+from lean_render import apply_lean_options, block_resources, wait_until_ready
+from header_profiles import HeaderProfilePool
+from proxy_harvest import DEFAULT_SOURCES, ProxyHarvester
+from streaming import HTML_CONTENT_TYPES, fetch_body
+from charsets import CHARSETS
+from near_dup import SimHashIndex
+# Selenium (browser automation), requests and fake_useragent are imported where they are used
 
 # ==================== CONFIG ====================
 # Swap between httpx and Selenium. If you want to use Selenium, set this to True, otherwise False for httpx
 SELENIUM_CRAWL = False 
 
+# Hybrid mode (httpx only): pages that look client-rendered are re-fetched with Selenium.
+# Once a host has served such a page and Selenium rendered it, all of its pages go straight to Selenium
+# (a failed render sends the host back to httpx). Turned off at startup if chromedriver is missing.
+HYBRID_CRAWL = True
+RENDER_MIN_WORDS = 50         # Fewer visible words than this, next to <script> tags, means client-rendered
+RENDER_SELECTORS = {}         # Host -> CSS selectors the static HTML must contain, e.g. {"example.com": ["div.price"]}
+RENDER_ESCALATE_AFTER = 1     # Client-rendered pages on a host before the host is switched to Selenium
+
 # Tor control port and password (if set)
 TOR_CONTROL_PORT = 9051  # Default Tor control port  
 TOR_PASSWORD = False     # Set to your Tor control password if required
 THE_PASSWORD = "password"  
 
 # Maximum number of retries for failed requests
+# Failed URLs go back on the frontier after an exponential backoff (with jitter) and are retried on
+# another proxy/circuit; permanent errors (4xx other than 408/429) are not retried
 MAX_RETRIES = 3
+RETRY_BASE_DELAY = 2      # Seconds before the first retry (upper bound, jittered), doubles per attempt
+RETRY_MAX_DELAY = 60      # Cap on the backoff
+RETRY_MAX_AFTER = 300     # Give up on URLs whose Retry-After asks for a longer wait
 
 # Frequency to rotate circuits
 ROTATE_FREQUENCY = 2
 
+# Parallel Tor circuits
+# Each SOCKS proxy is split into isolated circuits via per-worker SOCKS credentials (IsolateSOCKSAuth)
+CIRCUITS_PER_PROXY = 4        # 0 disables isolation and uses each proxy as a single circuit
+EXTRA_TOR_INSTANCES = 0       # Extra tor processes to launch locally, each adds CIRCUITS_PER_PROXY circuits
+TOR_PATH = "tor"              # Path to the tor binary (only needed for EXTRA_TOR_INSTANCES)
+TOR_BASE_SOCKS_PORT = 9060    # SocksPort of the first extra instance, the others count up from it
+TOR_DATA_DIR = "tor_data"     # Parent directory for the extra instances' data directories
+
+# Per-host politeness (replaces the global delay between requests)
+# Each host sees Gaussian-jittered gaps between requests and a token-bucket rate cap; requests to other
+# hosts go ahead in the meantime, so throughput grows with the number of distinct hosts
+HOST_DELAY_MEAN = 3.0     # Mean gap between two requests to the same host (seconds, 0 disables)
+HOST_DELAY_STDDEV = 1.0   # Jitter of the gap
+HOST_DELAY_MIN = 0.5      # Smallest gap
+HOST_RATE = 0.5           # Token-bucket cap per host (requests/second, None disables)
+HOST_BURST = 1            # Requests a host may receive back to back
+CIRCUIT_RATE = None       # Optional token-bucket cap per circuit (requests/second)
+CIRCUIT_BURST = 1
+
+# Concurrency settings for the worker pool in crawl()
+# Workers are spawned per circuit (capped by MAX_CONCURRENCY), so adding proxies/circuits adds throughput
+WORKERS_PER_CIRCUIT = 2
+MAX_CONCURRENCY = 8   # Global cap on requests in flight at once
+MAX_PER_HOST = 2      # Cap on requests in flight against a single host
+
+# Pooled httpx clients (one per proxy/circuit) so connections are reused across requests
+POOL_MAX_CONNECTIONS = 10   # Max open connections per client
+POOL_MAX_KEEPALIVE = 5      # Max idle keep-alive connections per client
+POOL_KEEPALIVE_EXPIRY = 30  # Seconds an idle connection stays open
+CLIENT_IDLE_EXPIRY = 300    # Seconds an unused client is kept before it is closed
+HTTP2 = False               # Offer HTTP/2 (needs h2): requests to a host share one connection/Tor stream
+HTTP2_ONLY = False          # HTTP/2 without negotiation, also over http:// (h2c servers only)
+ACCEPT_ENCODING = None      # None: every coding httpx can decode (gzip, deflate + br/zstd when installed)
+
+# Bounded downloads: responses are streamed and dropped early instead of read whole
+ALLOWED_CONTENT_TYPES = HTML_CONTENT_TYPES  # Other Content-Types are rejected from the headers (None allows all)
+MAX_RESPONSE_BYTES = 5 * 1024 * 1024        # Per-response byte budget, decompressed (None for no limit)
+TRUNCATE_OVERSIZED = False                  # True: keep and parse the first MAX_RESPONSE_BYTES instead of rejecting
+
+# Number of processes used to parse fetched pages off the event loop (0 = parse inline)
+PARSE_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+# Where results are streamed as they are produced: "jsonl" (OUTPUT_PATH), "parquet" (RESULTS_DIR) or "stdout"
+OUTPUT_SINK = "jsonl"
+OUTPUT_PATH = "crawl_results.jsonl"
+RESULTS_DIR = "crawl_results"   # Parquet segments + index.db, read back with results_store.ResultsStore
+SINK_BUFFER = 100   # Max results buffered before workers wait for the writer
+
 # List of proxies (SOCKS5)
 PROXIES = ["socks5h://127.0.0.1:9050"] #fetch_proxies()
+
+# Public proxy lists, harvested concurrently and cached (adds untrusted proxies: not anonymous like Tor!)
+HARVEST_PROXIES = False           # Add harvested proxies to PROXIES at startup
+PROXY_SOURCES = DEFAULT_SOURCES   # ProxySource(name, url, protocol) entries
+PROXY_HARVEST_CACHE = "proxy_cache.json"
+PROXY_HARVEST_TTL = 1800          # Seconds a harvested list is reused before the sources are queried again
+PROXY_HARVEST_LIMIT = 50          # Max harvested proxies handed to the health checker
+
+# Proxy health management
+PROXY_CHECK_URL = "https://httpbin.org/ip"  # Must return JSON with an "ip" or "origin" field
+PROXY_STATS_WINDOW = 20       # Recent requests used for rolling latency/error rate
+PROXY_EJECT_AFTER = 3         # Consecutive failures before a proxy is ejected
+PROXY_MAX_ERROR_RATE = 0.5    # Error rate over a full window that ejects a proxy
+PROXY_COOLDOWN = 30           # Seconds before an ejected proxy is re-probed (doubles each time)
+PROXY_PROBE_INTERVAL = 10     # Seconds between background probe rounds
+PROXY_WAIT_TIMEOUT = 120      # Seconds a worker waits for a healthy proxy before the URL goes through the retry path
  
 # User-Agent and header rotation pool
 # This can help avoid detection by making requests appear to come from different browsers
@@ -105,7 +218,42 @@ REFERERS = [
     "https://www.yahoo.com",
 ]
 
-# Target URLs to crawl
+# Header profiles: HEADERS_POOL, ACCEPT_LANGUAGES, REFERERS and a sample of fake_useragent combined once into
+# consistent UA/Accept-Language/Referer sets and cached on disk, instead of loading fake_useragent per request
+HEADER_PROFILES = 200                         # Profiles to build
+HEADER_PROFILES_PATH = "header_profiles.json" # Cache file (None disables caching)
+HEADER_PROFILES_MAX_AGE = 7 * 24 * 3600       # Seconds before the cache is rebuilt with fresh user agents
+
+# Recursive crawling: links found on fetched pages are scheduled up to MAX_DEPTH
+MAX_DEPTH = 1                 # 0 = only crawl URLS_TO_CRAWL
+MAX_PAGES = 200               # Stop scheduling new URLs after this many (None for no limit)
+FOLLOW_EXTERNAL = False       # Also follow links to hosts other than the seed hosts
+FRONTIER_CAPACITY = 10_000_000  # Expected distinct URLs, sizes the dedup Bloom filter (~12 MB at 10M)
+
+# Checkpoint/resume: crawl state is kept in SQLite so an interrupted crawl picks up where it stopped
+STATE_DB = "crawl_state.db"
+RESUME = True                 # Resume an interrupted crawl (a finished one starts over), False always starts fresh
+STATE_BATCH_SIZE = 100        # State updates committed per transaction
+STATE_FLUSH_INTERVAL = 5      # Max seconds between commits
+
+# Near-duplicate detection: fetched pages are SimHash-fingerprinted (visible text) before extraction.
+# Mirrors, session-parameter variants and soft-404s of a page already crawled are caught (httpx only)
+NEAR_DUP = "skip"             # skip: not extracted or stored | mark: stored with 'duplicate_of' | None: off
+NEAR_DUP_DISTANCE = 3         # Differing bits (of 64) that still count as a near-duplicate (max 3)
+NEAR_DUP_MIN_WORDS = 50       # Pages with fewer visible words are never treated as duplicates
+
+# HTTP response cache: unchanged pages are revalidated (ETag / Last-Modified) instead of refetched
+HTTP_CACHE = True
+HTTP_CACHE_PATH = "http_cache.db"
+HTTP_CACHE_MAX_MB = 512       # Cap on compressed bodies, least recently used entries are evicted
+
+# Instrumentation (per-stage latency histograms, per proxy/circuit counters, bytes)
+METRICS_PORT = None           # Serve Prometheus metrics on http://127.0.0.1:PORT/metrics (None disables)
+METRICS_DUMP_INTERVAL = 60    # Seconds between stats dumps to stdout (0 disables)
+PROFILE_OUTPUT = None         # Write a sampling profile of the event loop here, e.g. "crawl.folded"
+PROFILE_INTERVAL = 0.005      # Seconds between profiler samples
+
+# Target URLs to crawl (seeds)
 URLS_TO_CRAWL = [
     "https://example.com",
     "https://httpbin.org",
@@ -116,161 +264,150 @@ URLS_TO_CRAWL = [
 
 CHROME_DRIVER_PATH = "C:\\Repos\\chromedriver-win64\\chromedriver.exe"  #This is machine dependent!! Change this path to location of install
 
+# Warm Selenium browser pool (drivers are reused across pages instead of launched per URL)
+BROWSER_POOL_SIZE = 4         # Max Chrome instances alive at once
+BROWSER_MAX_PAGES = 50        # Pages per driver before it is replaced
+BROWSER_MAX_MEMORY_MB = 1024  # Recycle a driver above this RSS (needs psutil)
+
+# Lean Selenium page loads (readiness waits + resource blocking instead of a fixed sleep)
+LEAN_RENDER = True
+PAGE_LOAD_STRATEGY = "eager"          # normal | eager (DOMContentLoaded) | none
+PAGE_LOAD_TIMEOUT = 20                # Seconds before driver.get gives up (the page is still extracted)
+READY_CONDITION = "network_idle"      # dom | network_idle | selector
+READY_SELECTOR = None                 # CSS selector for READY_CONDITION = "selector"
+READY_TIMEOUT = 10                    # Max seconds to wait for the ready condition
+NETWORK_IDLE_TIME = 0.5               # Quiet period that counts as network idle
+BLOCKED_RESOURCES = ("image", "font", "stylesheet", "media")  # Never used by the extractor
+
 # ==================== UTILITIES ====================
 
-def fetch_user_agent() -> str:
-    """
-    Fetches a random User-Agent string from the fake_useragent library.
-    Returns:
-        str: A random User-Agent string.
-    """
-    ua = UserAgent()
-    return ua.random
- 
+# Built (or loaded from HEADER_PROFILES_PATH) on first use
+HEADER_PROFILE_POOL = HeaderProfilePool(HEADERS_POOL, ACCEPT_LANGUAGES, REFERERS, HEADER_PROFILES,
+                                        HEADER_PROFILES_PATH, HEADER_PROFILES_MAX_AGE)
+
 def fetch_proxies(limit=20):
     """
-    Scrapes free HTTPS proxies from a public proxy listing website.
-    Filters only HTTPS proxies and returns a list of IP:Port strings.
+    Public HTTPS/SOCKS proxies from all PROXY_SOURCES (harvested concurrently, cached for PROXY_HARVEST_TTL).
 
     Note: This is not currently used in the main logic but can be
-    swapped in as an alternative to Tor or SOCKS proxies.
-    """
-    url = "https://free-proxy-list.net/"
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, "html.parser")
-    proxy_list = []
-
-    for row in soup.select("div.fpl-list table tbody tr"):
-        #print(row)
-        cols = row.find_all("td")
-        ip = cols[0].text.strip()
-        port = cols[1].text.strip()
-        is_https = cols[6].text.strip().lower() == "yes"
-        anonymity = cols[4].text.strip().lower()
-
-        if is_https: #and "elite" in anonymity:
-            proxy_list.append(f"{ip}:{port}")
-        if len(proxy_list) >= limit:
-            break
-
-    return proxy_list
-
-async def gaussian_delay(mean=3.0, stddev=1.0):
-    """
-    Introduces a random delay between requests based on a Gaussian (normal) distribution.
-    Helps simulate human-like browsing behavior and avoid detection.
-    Args:
-        mean (float): Mean time delay in seconds.
-        stddev (float): Standard deviation of the delay.
+    swapped in as an alternative to Tor or SOCKS proxies (see HARVEST_PROXIES).
     """
-    delay = max(0.5, random.gauss(mean, stddev))
-    print(f"Delaying for {delay:.2f} seconds")
-    await asyncio.sleep(delay)
+    return ProxyHarvester(PROXY_SOURCES, PROXY_HARVEST_CACHE, PROXY_HARVEST_TTL, limit=limit).get_sync()
 
-async def test_proxy(proxy: str) -> bool:
+def browser_available() -> bool:
     """
-    Tests whether a single proxy is functional by sending a request to httpbin.org/ip.
-    Args:
-        proxy (str): Proxy string in format "http://ip:port" or "socks5://ip:port".
-    Returns:
-        bool: True if proxy works, False otherwise.
+    Cheap check that Selenium is installed and CHROME_DRIVER_PATH points to a chromedriver.
+    Hybrid mode is turned off without one, instead of sending thin pages to a browser that cannot start.
     """
     try:
-        response = requests.get("https://httpbin.org/ip", proxies={
-            "http": proxy,
-            "https": proxy
-        }, timeout=10)
-
-        # Check if response is JSON
-        content_type = response.headers.get('content-type', '')
-        if 'application/json' not in content_type:
-            print(f"Proxy {proxy} returned non-JSON response: {response.text[:100]}")
-            return False
-        
-        # Try parsing JSON
-        try:
-            json_data = response.json()
-            origin_ip = json_data.get('ip') or json_data.get('origin')
-            if not origin_ip:
-                print(f"Proxy {proxy} response lacks IP field: {json_data}")
-                return False
-            print(f"Proxy {proxy} is working. Origin IP: {origin_ip}")
-            return True
-        except ValueError as e:
-            print(f"Proxy {proxy} JSON parsing failed: {str(e)}. Response: {response.text[:100]}")
-            return False
-    except Exception as e:
-        print("Proxy test failed:", e)
+        import selenium  # noqa: F401
+    except ImportError:
         return False
-
-async def get_working_proxies() -> list:
-    """
-    Filters the list of configured proxies and returns only those that are operational.
-    Returns:
-        list: List of proxy strings that successfully passed the connectivity test.
-    """
-    tasks = [test_proxy(proxy) for proxy in PROXIES]
-    results = await asyncio.gather(*tasks)
-    return [PROXIES[i] for i, ok in enumerate(results) if ok]
+    return os.path.isfile(CHROME_DRIVER_PATH) or shutil.which(CHROME_DRIVER_PATH) is not None
 
 def create_browser(proxy, user_agent):
     """
-    Configures and launches a headless Chrome browser through a SOCKS5 proxy and custom User-Agent.
+    Configures and launches a headless Chrome browser through a proxy and custom User-Agent.
     Used for dynamic web content scraping via Selenium.
     Args:
-        proxy (str): SOCKS5 proxy in format "ip:port".
+        proxy (str): Proxy URL (socks5h://, socks4://, http://...) or a SOCKS5 proxy as "ip:port".
         user_agent (str): User-Agent string to override browser fingerprinting.
     Returns:
         WebDriver or None: A Selenium WebDriver instance or None on failure.
     """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from selenium.common.exceptions import WebDriverException
+
     chrome_options = Options()
     chrome_options.add_argument("--headless=new")
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument(f"user-agent={user_agent}")
-    chrome_options.add_argument(f"--proxy-server=socks5://{proxy}")
+    # Proxies may be given as full URLs (socks5h://host:port); Chrome wants scheme://host:port without
+    # credentials, and only knows socks5 (it always resolves DNS through the proxy)
+    if "://" in proxy:
+        parts = urlparse(proxy)
+        scheme = "socks5" if parts.scheme.startswith("socks5") else parts.scheme
+        proxy_server = f"{scheme}://{parts.netloc.rsplit('@', 1)[-1]}"
+    else:
+        proxy_server = f"socks5://{proxy}"
+    chrome_options.add_argument(f"--proxy-server={proxy_server}")
+    if LEAN_RENDER:
+        apply_lean_options(chrome_options, BLOCKED_RESOURCES, PAGE_LOAD_STRATEGY)
 
     try:
         driver = webdriver.Chrome(service=Service(CHROME_DRIVER_PATH), options=chrome_options)
+        driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+        if LEAN_RENDER:
+            block_resources(driver, BLOCKED_RESOURCES)
         return driver
     except WebDriverException as e:
         print(f"Failed to launch Chrome with proxy {proxy}: {e}")
         return None
-    
-def selenium_delay(mean=3.0, stddev=1.0):
+
+class CrawlLimits:
     """
-    Similar to gaussian_delay but blocking. Used for spacing out Selenium browser sessions.
-    Args:
-        mean (float): Mean time delay in seconds.
-        stddev (float): Standard deviation of the delay.
+    Global and per-host concurrency caps shared by all crawl workers.
+    A worker must hold both a global slot and a slot for the target host before fetching.
     """
-    delay = max(0.5, np.random.normal(mean, stddev))
-    print(f"Delay: {delay:.2f}s")
-    time.sleep(delay)
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, max_per_host: int = MAX_PER_HOST):
+        self.global_limit = asyncio.Semaphore(max_concurrency)
+        self.max_per_host = max_per_host
+        self.host_limits = defaultdict(lambda: asyncio.Semaphore(self.max_per_host))
+
+    @asynccontextmanager
+    async def slot(self, host: str):
+        """
+        Waits for a free global slot and a free slot for the given host.
+        Args:
+            host (str): Network location (netloc) of the target URL.
+        """
+        async with self.global_limit, self.host_limits[host]:
+            yield
 
-def rotate_tor_circuit() -> bool:
+# ==================== CORE CRAWLER ====================
+
+def render_page(driver, url, proxy) -> Optional[Dict]:
     """
-    Rotate the Tor circuit by sending a NEWNYM signal to the Tor control port.
-        
-    Returns:
-        bool: True if rotation was successful, False otherwise.
+    Loads a page in an already running browser and extracts its data.
+    Args:
+        driver (WebDriver): Selenium driver (fresh or from the BrowserPool).
+        url (str): Target URL to crawl.
+        proxy (str): Proxy the driver uses (for logging).
     """
+    if not driver:
+        return None
+    from selenium.common.exceptions import TimeoutException
+
+    labels = {"proxy": proxy_key(proxy), "backend": "selenium"}
     try:
-        with Controller.from_port(port=9051) as controller:
-            if TOR_PASSWORD:
-                controller.authenticate(password=THE_PASSWORD)
+        with METRICS.timer("crawl_stage_seconds", stage="render"):
+            if LEAN_RENDER:
+                try:
+                    driver.get(url)
+                except TimeoutException:
+                    # Stop the stragglers and extract what has loaded so far
+                    driver.execute_script("window.stop();")
+                if not wait_until_ready(driver, READY_CONDITION, READY_SELECTOR, READY_TIMEOUT, NETWORK_IDLE_TIME):
+                    print(f"Page not ready after {READY_TIMEOUT}s ({READY_CONDITION}): {url}")
             else:
-                controller.authenticate()
-            controller.signal(Signal.NEWNYM)
-            time.sleep(10)  # Wait for new circuit to stabilize (Tor's minimum)
-            print("Successfully rotated Tor circuit")
-            return True
+                driver.get(url)
+                time.sleep(2)# Wait for page load
+        title = driver.title
+        html = driver.page_source.encode('utf-8')
+        METRICS.inc("crawl_bytes_total", len(html), kind="body", **labels)
+        with METRICS.timer("crawl_stage_seconds", stage="parse"):
+            result = extract_page(html, url, title=title, encoding='utf-8')
+        METRICS.inc("crawl_requests_total", outcome="ok", **labels)
+        print(f"Successfully fetched {url} | Proxy: {proxy} | Title: {title}")
+        return result
     except Exception as e:
-        print(f"Failed to rotate Tor circuit: {str(e)}")
-        return False
-
-# ==================== CORE CRAWLER ====================
+        print(f"Error fetching {url} with proxy {proxy}: {str(e)}")
+        METRICS.inc("crawl_requests_total", outcome="error", **labels)
+        return None
 
-def selenium_crawl(url, proxy, user_agent)-> Optional[Dict]:
+def selenium_crawl(url, proxy, user_agent, browsers: Optional[BrowserPool] = None)-> Optional[Dict]:
     """
     Uses Selenium to load a full webpage through a SOCKS5 proxy and scrape its title.
     Can be extended to extract dynamic JavaScript-rendered content.
@@ -278,210 +415,384 @@ def selenium_crawl(url, proxy, user_agent)-> Optional[Dict]:
         url (str): Target URL to crawl.
         proxy (str): SOCKS5 proxy in format "ip:port".
         user_agent (str): Browser user-agent string.
+        browsers (BrowserPool): Pool of warm drivers. Without one, a browser is launched and quit for this URL.
     """
+    if browsers:
+        with browsers.driver(proxy, user_agent) as driver:
+            return render_page(driver, url, proxy)
+
     driver = create_browser(proxy, user_agent)
     if not driver:
         return
-
     try:
-        driver.get(url)
-        time.sleep(2)# Wait for page load
-        title = driver.title
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        quotes = soup.find_all('span', {'class': 'text'})
-        authors = soup.find_all('small', {'class': 'author'})
-            
-        # New fields
-        parsed_url = urlparse(url)
-        domain = parsed_url.netloc
-                
-        # Meta tags
-        meta_description = soup.find('meta', attrs={'name': 'description'})
-        meta_description = meta_description['content'] if meta_description and 'content' in meta_description.attrs else None
-        meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
-        meta_keywords = meta_keywords['content'] if meta_keywords and 'content' in meta_keywords.attrs else None
-                
-        # Links
-        links = soup.find_all('a', href=True)
-        internal_links = [link['href'] for link in links if urlparse(link['href']).netloc == domain]
-        external_links = [link['href'] for link in links if urlparse(link['href']).netloc and urlparse(link['href']).netloc != domain]
-                
-        # Images
-        images = [{'src': img.get('src'), 'alt': img.get('alt')} for img in soup.find_all('img') if img.get('src')]
-                
-        # Headings
-        headings = []
-        for tag in ['h1', 'h2', 'h3']:
-            headings.extend([h.get_text(strip=True) for h in soup.find_all(tag)])
-                
-        # Paragraphs
-        paragraphs = [p.get_text(strip=True) for p in soup.find_all('p') if p.get_text(strip=True)]
-                
-        # Social media metadata
-        og_data = {meta['property']: meta['content'] for meta in soup.find_all('meta', property=True) if 'content' in meta.attrs}
-        twitter_data = {meta['name']: meta['content'] for meta in soup.find_all('meta', attrs={'name': lambda x: x and x.startswith('twitter:')}) if 'content' in meta.attrs}
-                
-        # Page stats
-        html_size = len(str(soup).encode('utf-8'))
-        visible_text = soup.get_text(strip=True)
-        word_count = len(visible_text.split())
-                
-        # Scripts
-        #scripts = [script.get('src') or script.get_text(strip=True) for script in soup.find_all('script')]
-                
-        result = {
-                    'url': url,
-                    'title': title,
-                    'quotes_count': len(quotes),
-                    'authors_count': len(authors),
-                    'meta_description': meta_description,
-                    'meta_keywords': meta_keywords,
-                    'internal_links': internal_links,
-                    'external_links': external_links,
-                    'images': images,
-                    'headings': headings,
-                    'paragraphs': paragraphs,
-                    'og_data': og_data,
-                    'twitter_data': twitter_data,
-                    'html_size': html_size,
-                    'word_count': word_count
-                    #'scripts': scripts
-        }
-        print(f"Successfully fetched {url} | Proxy: {proxy} | Title: {title}")
-        return result
-    except Exception as e:
-        print(f"Error fetching {url} with proxy {proxy}: {str(e)}")
-        return None
+        return render_page(driver, url, proxy)
     finally:
         driver.quit()
 
-async def httpx_crawl(url: str, theproxy: str, headers: dict, attempt: int = 0) -> Optional[Dict]:
+async def httpx_crawl(url: str, theproxy: str, headers: dict,
+                      pool: Optional[ClientPool] = None, circuit: Optional[str] = None,
+                      parse_pool: Optional[ParsePool] = None,
+                      proxy_manager: Optional[ProxyManager] = None,
+                      cache: Optional[ResponseCache] = None,
+                      render_policy: Optional[RenderPolicy] = None,
+                      near_dups: Optional[SimHashIndex] = None) -> Dict:
     """
     Sends an HTTP GET request through a proxy with randomized headers using httpx (async).
     Extracts page data/elements (for demo purposes).
+    Makes a single attempt: retries are scheduled by crawl() so the worker is not held up.
     Args:
         url (str): The target webpage URL.
         theproxy (str): Proxy string.
         headers (dict): Custom headers to use.
+        pool (ClientPool): Pool of long-lived clients. Without one, a single-use client is opened.
+        circuit (str): Circuit identity used to pick the pooled client.
+        parse_pool (ParsePool): Process pool for parsing. Without one, the page is parsed inline.
+        proxy_manager (ProxyManager): Receives latency/outcome of every attempt for proxy scoring.
+        cache (ResponseCache): Response cache. Cached pages are revalidated with a conditional GET.
+        render_policy (RenderPolicy): If given, client-rendered pages get a 'render_reason' key (hybrid mode).
+        near_dups (SimHashIndex): If given, near-duplicates of pages already seen get a 'duplicate_of' key
+            (and, with NEAR_DUP = "skip", are not extracted at all).
+    Raises:
+        FetchError: The classified failure (connect, timeout, 5xx, 429, ...).
     """
 
+    # Label by circuit slot, not by its current credentials, so renewals do not add new series
+    labels = {"proxy": proxy_key(theproxy), "circuit": circuit.split(":", 1)[0] if circuit else None}
     try:
-        async with httpx.AsyncClient(proxy=theproxy, headers=headers, timeout=10) as client:
-            r = await client.get(url)
-            r.raise_for_status()
-            soup = BeautifulSoup(r.text, "html.parser")
-            title = soup.title.string.strip() if soup.title else "No title found"
-            quotes = soup.find_all('span', {'class': 'text'})
-            authors = soup.find_all('small', {'class':'author'})
-
-            # New fields
-            parsed_url = urlparse(url)
-            domain = parsed_url.netloc
-                
-            # Meta tags
-            meta_description = soup.find('meta', attrs={'name': 'description'})
-            meta_description = meta_description['content'] if meta_description and 'content' in meta_description.attrs else None
-            meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
-            meta_keywords = meta_keywords['content'] if meta_keywords and 'content' in meta_keywords.attrs else None
-                
-            # Links
-            links = soup.find_all('a', href=True)
-            internal_links = [link['href'] for link in links if urlparse(link['href']).netloc == domain]
-            external_links = [link['href'] for link in links if urlparse(link['href']).netloc and urlparse(link['href']).netloc != domain]
-                
-            # Images
-            images = [{'src': img.get('src'), 'alt': img.get('alt')} for img in soup.find_all('img') if img.get('src')]
-                
-            # Headings
-            headings = []
-            for tag in ['h1', 'h2', 'h3']:
-                headings.extend([h.get_text(strip=True) for h in soup.find_all(tag)])
-                
-            # Paragraphs
-            paragraphs = [p.get_text(strip=True) for p in soup.find_all('p') if p.get_text(strip=True)]
-                
-            # Social media metadata
-            og_data = {meta['property']: meta['content'] for meta in soup.find_all('meta', property=True) if 'content' in meta.attrs}
-            twitter_data = {meta['name']: meta['content'] for meta in soup.find_all('meta', attrs={'name': lambda x: x and x.startswith('twitter:')}) if 'content' in meta.attrs}
-                
-            # Page stats
-            html_size = len(str(soup).encode('utf-8'))
-            visible_text = soup.get_text(strip=True)
-            word_count = len(visible_text.split())
-                
-            # Scripts
-            #scripts = [script.get('src') or script.get_text(strip=True) for script in soup.find_all('script')]
-                
-            result = {
-                    'url': url,
-                    'title': title,
-                    'quotes_count': len(quotes),
-                    'authors_count': len(authors),
-                    'status': r.status_code,
-                    'meta_description': meta_description,
-                    'meta_keywords': meta_keywords,
-                    'internal_links': internal_links,
-                    'external_links': external_links,
-                    'images': images,
-                    'headings': headings,
-                    'paragraphs': paragraphs,
-                    'og_data': og_data,
-                    'twitter_data': twitter_data,
-                    'html_size': html_size,
-                    'word_count': word_count
-                    #'scripts': scripts
-            }
+        cached = await cache.lookup(url) if cache else None
+        if cached:
+            headers = {**headers, **cached.conditional_headers()}
+        if pool:
+            client_cm = pool.client(theproxy, circuit)
+        else:
+            client_cm = new_client(theproxy, http2=HTTP2, http2_only=HTTP2_ONLY, encoding=ACCEPT_ENCODING)
+        async with client_cm as client:
+            trace = RequestTrace()
+            start = time.monotonic()
+            body, truncated = None, False
+            try:
+                # Streamed: non-HTML or oversized responses are dropped before (or while) they download
+                async with client.stream("GET", url, headers=headers, extensions={"trace": trace}) as r:
+                    if r.is_success:
+                        body, truncated = await fetch_body(r, ALLOWED_CONTENT_TYPES, MAX_RESPONSE_BYTES,
+                                                           TRUNCATE_OVERSIZED)
+            except httpx.TransportError:
+                # Connect/SOCKS/timeout failures count against the proxy, HTTP errors do not
+                if proxy_manager:
+                    proxy_manager.record(theproxy, time.monotonic() - start, False)
+                METRICS.inc("crawl_requests_total", outcome="transport_error", **labels)
+                raise
+            except FetchError as e:
+                # Rejected content: the proxy did its job
+                if proxy_manager:
+                    proxy_manager.record(theproxy, time.monotonic() - start, True)
+                METRICS.inc("crawl_requests_total", outcome=e.kind, **labels)
+                METRICS.inc("crawl_bytes_total", r.num_bytes_downloaded, kind="wire", proxy=labels["proxy"])
+                raise
+            elapsed = time.monotonic() - start
+            if proxy_manager:
+                proxy_manager.record(theproxy, elapsed, True)
+            trace.record(METRICS)
+            METRICS.observe("crawl_stage_seconds", elapsed, stage="fetch")
+            METRICS.inc("crawl_bytes_total", r.num_bytes_downloaded, kind="wire", proxy=labels["proxy"])
+            METRICS.inc("crawl_responses_total", http_version=r.http_version,
+                        encoding=r.headers.get("content-encoding", "identity"))
+            if r.status_code == 304 and cached:
+                # Not modified: extract from the cached body
+                METRICS.inc("crawl_requests_total", outcome="not_modified", **labels)
+                await cache.hit(url)
+                body = cached.body
+            else:
+                METRICS.inc("crawl_requests_total", outcome="ok" if r.is_success else f"http_{r.status_code}",
+                            **labels)
+                r.raise_for_status()
+                METRICS.inc("crawl_bytes_total", len(body), kind="body", proxy=labels["proxy"])
+                if truncated:
+                    print(f"Truncated {url} at {MAX_RESPONSE_BYTES} bytes")
+                elif cache:
+                    await cache.store(url, r.headers, body)
+            # Encoding from headers/BOM/<meta> (or the host's last one), so the parser does not sniff the body.
+            # A full-body UTF-8 check or charset detection can take tens of ms, so it runs off the event loop
+            host = urlparse(url).netloc.lower()
+            content_type = cached.content_type if r.status_code == 304 and cached else r.headers.get("content-type")
+            with METRICS.timer("crawl_stage_seconds", stage="charset"):
+                encoding = await asyncio.to_thread(CHARSETS.resolve, host, body, content_type)
+            duplicate_of = None
+            if near_dups:
+                with METRICS.timer("crawl_stage_seconds", stage="fingerprint"):
+                    fingerprint = await asyncio.to_thread(near_dups.fingerprint, body, encoding)
+                duplicate_of = near_dups.check(url, fingerprint)
+                if duplicate_of:
+                    METRICS.inc("crawl_near_duplicates_total", action=NEAR_DUP)
+                    if NEAR_DUP == "skip":
+                        print(f"Near-duplicate of {duplicate_of}, not extracted: {url}")
+                        return {'url': url, 'status': r.status_code, 'duplicate_of': duplicate_of,
+                                'internal_links': [], 'external_links': []}
+            with METRICS.timer("crawl_stage_seconds", stage="parse"):
+                if parse_pool:
+                    result = await parse_pool.extract(body, url, status=r.status_code, encoding=encoding)
+                else:
+                    result = extract_page(body, url, status=r.status_code, encoding=encoding)
+            if duplicate_of:
+                result['duplicate_of'] = duplicate_of
+            if render_policy:
+                reason = await asyncio.to_thread(render_policy.reason, body, result, host, encoding)
+                if reason:
+                    result['render_reason'] = reason
+            title = result['title']
 
             print(f"Successfully fetched {url} | Proxy: {theproxy} | Title: {title}")
             return result
     except Exception as e:
-        if attempt < MAX_RETRIES:
-            print(f"Retrying {url} with proxy {theproxy} due to error: {e}")
-            await gaussian_delay()
-            return await httpx_crawl(url, theproxy, headers, attempt + 1)
-        print(f"Failed to fetch {url} after {MAX_RETRIES} via {theproxy}: {e}")
-        return None
-
-async def crawl(urls: list):
+        error = classify(e)
+        print(f"Failed to fetch {url} via {theproxy} ({error.kind}): {error}")
+        raise error from e
+
+async def fetch_page(url: str, proxy: str, headers: dict, pool: Optional[ClientPool] = None,
+                     parse_pool: Optional[ParsePool] = None, circuit: Optional[str] = None,
+                     proxy_manager: Optional[ProxyManager] = None,
+                     cache: Optional[ResponseCache] = None,
+                     browsers: Optional[BrowserPool] = None,
+                     render_policy: Optional[RenderPolicy] = None,
+                     near_dups: Optional[SimHashIndex] = None) -> Optional[Dict]:
+    """
+    Fetches a single URL with the configured backend (Selenium, httpx or hybrid).
+    Selenium is blocking, so it runs in a worker thread to keep the event loop free.
+    Raises FetchError when the page could not be fetched.
+    Args:
+        url (str): Target URL to crawl.
+        proxy (str): Proxy string.
+        headers (dict): Randomised request headers.
+        pool (ClientPool): Shared httpx clients for the httpx backend.
+        parse_pool (ParsePool): Process pool the httpx backend hands raw pages to.
+        circuit (str): Circuit identity, keeps isolated circuits on separate pooled clients.
+        proxy_manager (ProxyManager): Collects per-proxy latency and errors (httpx only).
+        cache (ResponseCache): Response cache for conditional refetches (httpx only).
+        browsers (BrowserPool): Warm Selenium drivers (Selenium and hybrid).
+        render_policy (RenderPolicy): Hybrid mode: httpx first, Selenium for client-rendered pages/hosts.
+        near_dups (SimHashIndex): Near-duplicate index for fetched pages (httpx only).
+    """
+    if SELENIUM_CRAWL:
+        result = await asyncio.to_thread(selenium_crawl, url, proxy, headers["User-Agent"], browsers)
+        if result is None:
+            raise FetchError(RENDER, "browser could not load the page")
+        return result
+    if render_policy is None:
+        return await httpx_crawl(url, proxy, headers, pool=pool, circuit=circuit, parse_pool=parse_pool,
+                                 proxy_manager=proxy_manager, cache=cache, near_dups=near_dups)
+
+    host = urlparse(url).netloc.lower()
+    result = reason = None
+    if not render_policy.should_render(host):
+        result = await httpx_crawl(url, proxy, headers, pool=pool, circuit=circuit, parse_pool=parse_pool,
+                                   proxy_manager=proxy_manager, cache=cache, render_policy=render_policy,
+                                   near_dups=near_dups)
+        reason = result.pop('render_reason', None)
+        if not reason:
+            return result
+        render_policy.flag(host)
+    # Chrome cannot send SOCKS credentials, so it uses the circuit's base proxy
+    rendered = await asyncio.to_thread(selenium_crawl, url, proxy_key(proxy), headers["User-Agent"], browsers)
+    if rendered:
+        if render_policy.escalate(host):
+            print(f"Rendering all pages of {host} with Selenium from now on ({reason})")
+        return rendered
+    # The browser failed: back to httpx first for this host, and keep (or fetch) the static copy
+    if render_policy.demote(host):
+        print(f"Selenium failed on {host}, fetching its pages with httpx again")
+    if result is None:
+        result = await httpx_crawl(url, proxy, headers, pool=pool, circuit=circuit, parse_pool=parse_pool,
+                                   proxy_manager=proxy_manager, cache=cache, near_dups=near_dups)
+    return result
+
+async def crawl(urls: list, num_workers: Optional[int] = None, sink: Optional[ResultSink] = None):
     """
     Main crawl controller. Selects working proxies, rotates headers and either:
     - uses httpx for fast async scraping
     - or Selenium for dynamic content
+    URLs are pulled from the crawl frontier by a pool of async workers, and links
+    found on each page are fed back into it until MAX_DEPTH/MAX_PAGES is reached. Requests are
+    bounded by MAX_CONCURRENCY overall and MAX_PER_HOST per target host, and each
+    worker is pinned to its own isolated Tor circuit.
     Args:
-        urls (list): List of target URLs to process.
+        urls (list): Seed URLs to start crawling from.
+        num_workers (int): Number of workers. Defaults to WORKERS_PER_CIRCUIT per circuit, capped by MAX_CONCURRENCY.
+        sink (ResultSink): Where results are written. Defaults to the sink selected by OUTPUT_SINK.
     """
-    results = []
-    request_count = 0
-    working_proxies = await get_working_proxies()
-    if not working_proxies:
-        print("No working proxies found.")
-        return
-
-    for url in urls:
-        # Rotate Tor circuit after a certain number of requests
-        request_count += 1
-        if request_count % ROTATE_FREQUENCY == 0:
-            rotate_tor_circuit()
-           
-        proxy = random.choice(working_proxies)
-        headers = {
-           "User-Agent": fetch_user_agent(),
-           "Accept-Language": random.choice(ACCEPT_LANGUAGES),
-           "Referer": random.choice(REFERERS)
-           }
-    
-        if SELENIUM_CRAWL:
-            result = selenium_crawl(url, proxy, headers["User-Agent"])
-            selenium_delay()
+    async with AsyncExitStack() as stack:
+        instances = await stack.enter_async_context(
+            TorInstances(EXTRA_TOR_INSTANCES, TOR_BASE_SOCKS_PORT, TOR_PATH, TOR_DATA_DIR))
+        harvested = []
+        if HARVEST_PROXIES:
+            harvested = await ProxyHarvester(PROXY_SOURCES, PROXY_HARVEST_CACHE, PROXY_HARVEST_TTL,
+                                             limit=PROXY_HARVEST_LIMIT).get()
+        manager = ProxyManager(PROXIES + instances.proxies + harvested, PROXY_CHECK_URL, PROXY_STATS_WINDOW,
+                               PROXY_EJECT_AFTER, PROXY_MAX_ERROR_RATE, PROXY_COOLDOWN, PROXY_PROBE_INTERVAL)
+        await stack.enter_async_context(manager)
+        if not manager.healthy():
+            print("No working proxies found.")
+            return
+
+        # Circuits are built for every proxy, so ejected proxies can be used again once they recover
+        # Only Tor proxies are isolated; harvested ones do not accept the isolation credentials
+        circuits = CircuitPool(manager.proxies, CIRCUITS_PER_PROXY, isolate=PROXIES + instances.proxies)
+        if num_workers is None:
+            num_workers = min(MAX_CONCURRENCY, WORKERS_PER_CIRCUIT * len(circuits))
+
+        store = await stack.enter_async_context(StateStore(STATE_DB, STATE_BATCH_SIZE, STATE_FLUSH_INTERVAL))
+        frontier = Frontier(MAX_DEPTH, MAX_PAGES, FOLLOW_EXTERNAL, FRONTIER_CAPACITY, on_schedule=store.mark_pending)
+        resumed = RESUME and await asyncio.to_thread(store.interrupted)
+        if resumed:
+            # Finished pages are never refetched; interrupted ones go back on the frontier
+            done, pending, done_count = await asyncio.to_thread(store.resume)
+            for url in done:
+                frontier.mark_seen(url)
+            frontier.scheduled += done_count
+            frontier.seed(urls)
+            for url, depth in pending:
+                frontier.add(url, depth)
+            if done_count or pending:
+                print(f"Resuming crawl: {done_count} URLs finished, {len(pending)} pending")
         else:
-            result = await httpx_crawl(url, proxy, headers)
-            await gaussian_delay()
-        if result:
-            results.append(result)
-
-    with open('crawl_results.json', 'w') as f:
-            json.dump(results, f, indent=2)
-    print(f"Saved {len(results)} results to crawl_results.json")
+            await asyncio.to_thread(store.reset)
+            frontier.seed(urls)
+        await asyncio.to_thread(store.begin_run)
+        limits = CrawlLimits()
+        if sink is None:
+            # A resumed crawl adds to the interrupted run's results; a fresh one replaces them
+            sink = create_sink(OUTPUT_SINK, RESULTS_DIR if OUTPUT_SINK == "parquet" else OUTPUT_PATH, SINK_BUFFER,
+                               append=resumed)
+        pool = ClientPool(max_connections=POOL_MAX_CONNECTIONS, max_keepalive=POOL_MAX_KEEPALIVE,
+                          keepalive_expiry=POOL_KEEPALIVE_EXPIRY, idle_expiry=CLIENT_IDLE_EXPIRY,
+                          http2=HTTP2, http2_only=HTTP2_ONLY, encoding=ACCEPT_ENCODING)
+        tor = TorController(TOR_CONTROL_PORT, THE_PASSWORD if TOR_PASSWORD else None, on_rotate=pool.retire)
+        # Selenium already runs in a worker thread, so only the httpx backend needs the process pool
+        parse_pool = ParsePool(0 if SELENIUM_CRAWL else PARSE_WORKERS)
+        stack.enter_context(parse_pool)
+        await stack.enter_async_context(pool)
+        await stack.enter_async_context(sink)
+        await stack.enter_async_context(tor)
+        cache = browsers = render_policy = None
+        if HTTP_CACHE and not SELENIUM_CRAWL:
+            cache = await stack.enter_async_context(ResponseCache(HTTP_CACHE_PATH, HTTP_CACHE_MAX_MB * 1024 * 1024))
+        if HYBRID_CRAWL and not SELENIUM_CRAWL and not await asyncio.to_thread(browser_available):
+            print(f"Hybrid crawl disabled: Selenium or chromedriver ({CHROME_DRIVER_PATH}) not available")
+        elif HYBRID_CRAWL and not SELENIUM_CRAWL:
+            render_policy = RenderPolicy(RENDER_MIN_WORDS, selectors=RENDER_SELECTORS,
+                                         escalate_after=RENDER_ESCALATE_AFTER)
+        if SELENIUM_CRAWL or render_policy:
+            browsers = BrowserPool(create_browser, BROWSER_POOL_SIZE, BROWSER_MAX_PAGES, BROWSER_MAX_MEMORY_MB)
+            stack.push_async_callback(asyncio.to_thread, browsers.close)
+        await stack.enter_async_context(MetricsExporter(METRICS, METRICS_PORT, METRICS_DUMP_INTERVAL))
+        if PROFILE_OUTPUT:
+            stack.enter_context(SamplingProfiler(PROFILE_OUTPUT, PROFILE_INTERVAL))
+
+        politeness = PolitenessScheduler(HOST_DELAY_MEAN, HOST_DELAY_STDDEV, HOST_DELAY_MIN, HOST_RATE, HOST_BURST,
+                                         CIRCUIT_RATE, CIRCUIT_BURST)
+        retries = RetryPolicy(MAX_RETRIES, RETRY_BASE_DELAY, RETRY_MAX_DELAY, RETRY_MAX_AFTER)
+        near_dups = SimHashIndex(NEAR_DUP_DISTANCE, NEAR_DUP_MIN_WORDS) if NEAR_DUP and not SELENIUM_CRAWL else None
+        # Load (or build and cache) the header profiles before any worker needs them
+        await asyncio.to_thread(HEADER_PROFILE_POOL.load)
+        backend = "selenium" if SELENIUM_CRAWL else "hybrid" if render_policy else "httpx"
+
+        def retry_or_fail(url: str, depth: int, error: FetchError, proxy: Optional[str] = None, circuit=None):
+            delay = retries.schedule(url, error, proxy, circuit)
+            if delay is None:
+                print(f"Giving up on {url} ({error.kind}): {error}")
+                METRICS.inc("crawl_pages_total", backend=backend, outcome="failed")
+                store.mark_failed(url, f"{error.kind}: {error}")
+            else:
+                # Back on the frontier after the backoff; this worker moves straight on
+                print(f"Retrying {url} in {delay:.1f}s on another circuit ({error.kind})")
+                METRICS.inc("crawl_retries_total", kind=error.kind)
+                store.mark_retry(url, f"{error.kind}: {error}")
+                frontier.defer(url, depth, delay)
+
+        async def worker(worker_id: int):
+            while True:
+                url, depth = await frontier.get()
+                try:
+                    # Not this host's turn yet: park the URL until its slot and serve other hosts meanwhile
+                    host = urlparse(url).netloc
+                    wait = politeness.reserve(url, host)
+                    if wait > 0:
+                        METRICS.observe("crawl_stage_seconds", wait, stage="politeness", scope="host")
+                        METRICS.inc("crawl_deferrals_total", reason="politeness")
+                        frontier.defer(url, depth, wait)
+                        continue
+                    store.mark_in_flight(url)
+
+                    # Route to a fast, healthy proxy and use this worker's circuit on it.
+                    # A retried URL avoids the proxy and circuit it last failed on
+                    previous = retries.state(url)
+                    try:
+                        proxy_choice = await manager.acquire(exclude=previous.proxy if previous else None,
+                                                             timeout=PROXY_WAIT_TIMEOUT)
+                    except asyncio.TimeoutError:
+                        # Every proxy stayed ejected (e.g. Tor is down): fail through the retry path, don't hang
+                        retry_or_fail(url, depth, FetchError(CONNECT, f"no healthy proxy for {PROXY_WAIT_TIMEOUT}s"))
+                        continue
+                    circuit = circuits.on_proxy(proxy_choice, worker_id, exclude=previous.circuit if previous else None)
+
+                    # Rotate this worker's circuit after a certain number of requests, or when a retry is stuck on it.
+                    # Isolated circuits just switch credentials; plain proxies fall back to a background NEWNYM
+                    circuit.requests += 1
+                    if circuit.requests % ROTATE_FREQUENCY == 0 or (previous and circuit is previous.circuit):
+                        if circuit.isolated:
+                            old_url, old_id = circuit.url, circuit.id
+                            circuit.renew()
+                            METRICS.inc("crawl_circuit_renewals_total", proxy=circuit.proxy)
+                            await pool.discard(old_url, old_id)
+                        else:
+                            tor.request_newnym()
+
+                    # One consistent header profile per exit identity (renewed circuit or NEWNYM -> new profile)
+                    headers = HEADER_PROFILE_POOL.for_identity(f"{circuit.id}/{tor.rotations}")
+
+                    circuit_wait = politeness.circuit_wait(f"{circuit.proxy}#{circuit.index}")
+                    if circuit_wait:
+                        METRICS.observe("crawl_stage_seconds", circuit_wait, stage="politeness", scope="circuit")
+                        await asyncio.sleep(circuit_wait)
+
+                    # Chrome cannot send SOCKS credentials, so Selenium uses the circuit's base proxy
+                    proxy = circuit.proxy if SELENIUM_CRAWL else circuit.url
+                    try:
+                        async with limits.slot(host):
+                            result = await fetch_page(url, proxy, headers, pool, parse_pool, circuit.id, manager,
+                                                      cache, browsers, render_policy, near_dups)
+                    except Exception as e:
+                        store.record_host(host, False)
+                        retry_or_fail(url, depth, classify(e), circuit.proxy, circuit)
+                    else:
+                        retries.forget(url)
+                        store.record_host(host, True)
+                        if NEAR_DUP == "skip" and result.get('duplicate_of'):
+                            # Same content as a page already stored (and its links already followed there)
+                            METRICS.inc("crawl_pages_total", backend=backend, outcome="duplicate")
+                            store.mark_done(url)
+                            continue
+                        METRICS.inc("crawl_pages_total", backend=backend, outcome="ok")
+                        await sink.write(result)
+                        store.mark_done(url)
+                        links = result['internal_links'] + (result['external_links'] if FOLLOW_EXTERNAL else [])
+                        for link in links:
+                            frontier.add(link, depth + 1, base=url)
+                except Exception as e:
+                    print(f"[worker {worker_id}] Unexpected error on {url}: {e}")
+                    retries.forget(url)
+                    store.mark_failed(url, str(e))
+                finally:
+                    frontier.task_done()
+
+        print(f"Starting {num_workers} workers on {len(circuits)} circuits for {frontier.qsize()} queued URLs")
+        workers = [asyncio.create_task(worker(i)) for i in range(num_workers)]
+        await frontier.join()
+        for w in workers:
+            w.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        await store.finish_run()
+
+    print(f"Saved {sink.count} results to {sink.path}")
 
 # ==================== ENTRY POINT ====================
 
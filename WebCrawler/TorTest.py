@@ -1,12 +1,14 @@
 import httpx
 import asyncio
+from client_pool import accept_encoding, http2_available, new_client
 print("[DEBUG] Using httpx version:", httpx.__version__)
 print("[DEBUG] httpx module loaded from:", httpx.__file__)
+print("[DEBUG] HTTP/2:", http2_available(), "| Accept-Encoding:", accept_encoding())
 
 async def test_tor_proxy():
     proxy = "socks5h://127.0.0.1:9050"
-    async with httpx.AsyncClient(proxy=proxy, timeout=10) as client:
+    async with new_client(proxy, timeout=10, http2=True) as client:
         r = await client.get("https://httpbin.org/ip")
-        print("Tor IP:", r.json()["origin"])
+        print("Tor IP:", r.json()["origin"], "|", r.http_version)
 
 asyncio.run(test_tor_proxy())
\ No newline at end of file
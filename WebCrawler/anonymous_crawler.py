@@ -16,66 +16,14 @@ import requests
 import time
 import random
 import numpy as np
-
-def fetch_proxies_selenium(limit=10):
-    options = Options()
-    options.add_argument('--headless')
-    options.add_argument('--disable-gpu')
-    options.add_argument('--no-sandbox')
-    
-    driver = webdriver.Chrome(options=options)
-    driver.get("https://free-proxy-list.net/")
-    time.sleep(3)  # Wait for JS to render the table
-    soup = BeautifulSoup(driver.page_source, "html.parser")
-    driver.quit()
-
-    proxy_list = []
-    for row in soup.select("div.fpl-list table tbody tr"):
-        cols = row.find_all("td")
-        ip = cols[0].text.strip()
-        port = cols[1].text.strip()
-        is_https = cols[6].text.strip().lower() == "yes"
-        anonymity = cols[4].text.strip().lower()
-
-        if is_https: # and "elite" in anonymity:
-            proxy_list.append(f"{ip}:{port}")
-        if len(proxy_list) >= limit:
-            break
-    return proxy_list
-
-def fetch_proxies_1():
-    url = "https://proxylist.geonode.com/api/proxy-list?limit=10&page=1&sort_by=lastChecked&sort_type=desc"
-    res = requests.get(url)
-    proxies = []
-    if res.status_code == 200:
-        data = res.json()
-        for proxy in data.get("data", []):
-            ip = proxy["ip"]
-            port = proxy["port"]
-            proxies.append(f"{ip}:{port}")
-    return proxies
+from browser_pool import BrowserPool
+from proxy_harvest import ProxyHarvester
 
 # Proxy Source (Pluggable)
+# All sources in proxy_harvest.DEFAULT_SOURCES are queried concurrently; the list is cached for 30 minutes
 def fetch_proxies(limit=10):
-    url = "https://free-proxy-list.net/"
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, "html.parser")
-    proxy_list = []
-
-    for row in soup.select("div.fpl-list table tbody tr"):
-        print(row)
-        cols = row.find_all("td")
-        ip = cols[0].text.strip()
-        port = cols[1].text.strip()
-        is_https = cols[6].text.strip().lower() == "yes"
-        anonymity = cols[4].text.strip().lower()
-
-        if is_https: #and "elite" in anonymity:
-            proxy_list.append(f"{ip}:{port}")
-        if len(proxy_list) >= limit:
-            break
-
-    return proxy_list
+    harvester = ProxyHarvester(protocols=("http",), limit=limit)
+    return [proxy.split("://", 1)[1] for proxy in harvester.get_sync()]
 
 CHROME_DRIVER_PATH = "C:\\Repos\\chromedriver-win64\\chromedriver.exe"  #TODO: You got to Change this path to location of install
 GECKO_DRIVER_PATH = "C:\\\\Path\\\\To\\\\geckodriver.exe"
@@ -128,30 +76,36 @@ def add_laplace_noise(value, sensitivity=1.0, epsilon=0.5):
     return value + noise
 
 # Crawler Logic
-def crawl(urls, proxies):
-    for i, url in enumerate(urls):
-        #proxy = "51.158.123.35:8811"
-        proxy = proxies[i % len(proxies)]
-        print(f"Using proxy: {proxy}")
+BROWSER_MAX_PAGES = 50  # Pages per browser before it is replaced
 
-        if not is_proxy_working(proxy):
-            print(f"Skipping bad proxy: {proxy}")
-            continue
-
-        driver = create_browser_with_proxy(proxy)
-        try:
-            randomized_delay()
-            print(f"Crawling: {url}")
-            driver.get(url)
-            html = driver.page_source
-            soup = BeautifulSoup(html, "html.parser")
-            title = soup.title.string if soup.title else "No title"
-            noisy_length = add_laplace_noise(len(html))
-            print(f"Title: {title}, Length+Noise: {noisy_length:.1f}")
-        except Exception as e:
-            print(f"Error crawling {url}: {e}")
-        finally:
-            driver.quit()
+def crawl(urls, proxies):
+    # Browsers stay open between pages (one per proxy); each proxy is checked only once
+    proxy_ok = {}
+    with BrowserPool(lambda proxy, user_agent: create_browser_with_proxy(proxy),
+                     max_drivers=len(proxies), max_pages=BROWSER_MAX_PAGES) as browsers:
+        for i, url in enumerate(urls):
+            #proxy = "51.158.123.35:8811"
+            proxy = proxies[i % len(proxies)]
+            print(f"Using proxy: {proxy}")
+
+            if proxy not in proxy_ok:
+                proxy_ok[proxy] = is_proxy_working(proxy)
+            if not proxy_ok[proxy]:
+                print(f"Skipping bad proxy: {proxy}")
+                continue
+
+            with browsers.driver(proxy, "") as driver:
+                try:
+                    randomized_delay()
+                    print(f"Crawling: {url}")
+                    driver.get(url)
+                    html = driver.page_source
+                    soup = BeautifulSoup(html, "html.parser")
+                    title = soup.title.string if soup.title else "No title"
+                    noisy_length = add_laplace_noise(len(html))
+                    print(f"Title: {title}, Length+Noise: {noisy_length:.1f}")
+                except Exception as e:
+                    print(f"Error crawling {url}: {e}")
 
 # === Main ===
 if __name__ == "__main__":
@@ -160,7 +114,7 @@ if __name__ == "__main__":
         "http://httpbin.org/ip",
         "http://httpbin.org/user-agent"
     ]
-    proxy_list = fetch_proxies_selenium()
+    proxy_list = fetch_proxies()
     if not proxy_list:
         print("No proxies available. Exiting.")
     else:
@@ -5,9 +5,9 @@ import random
 import requests
 from stem import Signal
 from stem.control import Controller
-from fake_useragent import UserAgent
 from bs4 import BeautifulSoup
 import numpy as np
+from header_profiles import HeaderProfilePool
 
 # Configuration
 TOR_PATH = "C:\\Repos\\Tor\\tor.exe"  # Path to tor.exe 
@@ -15,6 +15,7 @@ TORRC_PATH = "C:\\Tor\\torrc"  # Path to torrc file
 TOR_CONTROL_PORT = 9051
 TOR_PASSWORD = "your_password"  # Set in torrc and hash it #TODO: don't hardcode password
 TOR_SOCKS_PROXY = "socks5h://127.0.0.1:9050"
+HEADER_PROFILES_PATH = "header_profiles_tor.json"  # User agents sampled once and cached here
 
 # Launch Tor process
 def launch_tor():
@@ -51,12 +52,11 @@ def randomized_delay(mean=5, jitter=2):
     print(f"Delaying for {delay:.2f} seconds...")
     time.sleep(delay)
 
-# Get randomized headers
+# Get randomized headers (from a pool built once, not a fresh UserAgent() per request)
+HEADER_PROFILE_POOL = HeaderProfilePool([], [], [], path=HEADER_PROFILES_PATH)
+
 def get_random_headers():
-    ua = UserAgent()
-    return {
-        'User-Agent': ua.random
-    }
+    return HEADER_PROFILE_POOL.random()
 
 # Add Laplace noise (differential privacy)
 def add_laplace_noise(value, sensitivity=1.0, epsilon=0.5):
@@ -0,0 +1,514 @@
+# Benchmark: end-to-end crawl throughput, fully offline
+# - Serves synthetic pages (configurable size, link density and latency) from a local HTTP server
+# - Routes the crawl through local SOCKS5 stand-ins that can inject connect delay and failures
+# - Drives Advanced_Crawler.crawl and reports pages/sec, p50/p95 fetch latency, CPU time and peak RSS
+# - Stores per-scenario baselines in bench_baselines.json and flags regressions against them
+# - --http2 serves the site over HTTP/2 (h2c) as well, --compress gzip|br|zstd compresses its pages;
+#   connections and bytes through the proxies are counted, so the savings show up next to the timings
+# The servers run in a separate process so their CPU and memory are not counted against the crawler.
+# Usage: py bench_crawl.py [scenario ...] [--pages N] [--save-baseline] ...   (py bench_crawl.py -h)
+
+import argparse
+import asyncio
+import contextlib
+import gzip
+import json
+import multiprocessing
+import os
+import platform
+import random
+import struct
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+try:
+    import resource  # Unix only
+except ImportError:
+    resource = None
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+    import h2.exceptions
+except ImportError:
+    h2 = None
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baselines.json")
+
+# Named scenarios; command line options override single values
+SCENARIOS = {
+    "static": dict(pages=200, page_kb=30, links=20, latency_ms=20, proxy_delay_ms=0, proxy_fail_rate=0.0),
+    "tor-like": dict(pages=200, page_kb=30, links=20, latency_ms=50, proxy_delay_ms=300, proxy_fail_rate=0.0),
+    "flaky-proxy": dict(pages=200, page_kb=30, links=20, latency_ms=20, proxy_delay_ms=50, proxy_fail_rate=0.1),
+    "heavy-pages": dict(pages=100, page_kb=300, links=100, latency_ms=20, proxy_delay_ms=0, proxy_fail_rate=0.0),
+}
+# Metric -> direction that counts as a regression
+REGRESSION_CHECKS = {"pages_per_sec": "lower", "p95_ms": "higher", "cpu_s_per_page": "higher", "peak_rss_mb": "higher"}
+
+# Pseudo-words from lorem ipsum syllables: a vocabulary large enough that distinct pages do not look like
+# near-duplicates of each other (near_dup.py)
+SYLLABLES = "lo rem ip sum do lor sit a met con sec te tur ad i pis cing e lit sed ei us mod tem por".split()
+WORDS = sorted({a + b + c for a in SYLLABLES for b in SYLLABLES for c in ("", "us", "um", "or", "it")})
+
+# ==================== SYNTHETIC SITE ====================
+
+def synthetic_page(page_id: int, site_pages: int, page_kb: int, links: int) -> bytes:
+    """
+    Deterministic page of roughly page_kb KiB with `links` internal links to other pages of the site.
+    """
+    rng = random.Random(page_id)
+    parts = [f"<!DOCTYPE html><html><head><title>Page {page_id}</title>",
+             f'<meta name="description" content="Synthetic page {page_id}">',
+             '<meta property="og:title" content="Synthetic"></head><body>',
+             f"<h1>Page {page_id}</h1><nav>"]
+    parts.extend(f"<a href='/page/{rng.randrange(site_pages)}'>link {i}</a>" for i in range(links))
+    parts.append("<a href='https://external.example/'>external</a></nav>")
+    size, i = sum(map(len, parts)), 0
+    while size < page_kb * 1024:
+        paragraph = f"<p>{' '.join(rng.choice(WORDS) for _ in range(60))}</p>"
+        if i % 10 == 0:
+            paragraph = f"<h2>Section {i}</h2><img src='/img/{i}.png' alt='figure {i}'>" + paragraph
+        parts.append(paragraph)
+        size += len(paragraph)
+        i += 1
+    parts.append("</body></html>")
+    return "".join(parts).encode("utf-8")
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == "gzip":
+        return gzip.compress(body, 6)
+    if coding == "br":
+        import brotli
+        return brotli.compress(body, quality=5)
+    import zstandard
+    return zstandard.ZstdCompressor(level=3).compress(body)
+
+_ENCODED: Dict = {}
+
+def site_response(site: Dict, path: str, accept_encoding: str):
+    """
+    Response for a request to the synthetic site.
+    Returns:
+        tuple: (status, content_type, body, content_encoding or None)
+    """
+    if path == "/ip":
+        return 200, "application/json", b'{"origin": "127.0.0.1"}', None
+    try:
+        page_id = int(path.rsplit("/", 1)[-1]) if path.startswith("/page/") else -1
+    except ValueError:
+        page_id = -1
+    if not 0 <= page_id < site["pages"]:
+        return 404, "text/html", b"<html><title>Not found</title></html>", None
+    coding = site.get("compress")
+    if not coding or coding not in [c.split(";")[0].strip() for c in accept_encoding.split(",")]:
+        coding = None
+    body = _ENCODED.get((page_id, coding))
+    if body is None:
+        body = synthetic_page(page_id, site["pages"], site["page_kb"], site["links"])
+        if coding:
+            body = compress(body, coding)
+        _ENCODED[(page_id, coding)] = body
+    return 200, "text/html; charset=utf-8", body, coding
+
+def site_latency(site: Dict, path: str) -> float:
+    if path == "/ip" or not site["latency_ms"]:
+        return 0.0
+    return max(0.0, random.gauss(site["latency_ms"], site["latency_ms"] / 4)) / 1000
+
+class SiteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like real servers
+    site: Dict = {}
+
+    def do_GET(self):
+        time.sleep(site_latency(self.site, self.path))
+        status, content_type, body, coding = site_response(self.site, self.path,
+                                                           self.headers.get("Accept-Encoding", ""))
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if coding:
+            self.send_header("Content-Encoding", coding)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class H2SiteProtocol(asyncio.Protocol):
+    """
+    The synthetic site over HTTP/2 without TLS (h2c, prior knowledge). Streams are answered concurrently.
+    """
+    def __init__(self, site: Dict):
+        self.site = site
+        self.conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False, header_encoding="utf-8"))
+        self.pending: Dict[int, memoryview] = {}
+        self.transport = None
+        self.started = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data: bytes):
+        if not self.started:
+            # Our preface waits for the client's: data arriving before the SOCKS reply is read would break it
+            self.conn.initiate_connection()
+            self.started = True
+        try:
+            events = self.conn.receive_data(data)
+        except h2.exceptions.ProtocolError:
+            self.transport.close()
+            return
+        for event in events:
+            if isinstance(event, h2.events.RequestReceived):
+                asyncio.ensure_future(self._respond(event.stream_id, dict(event.headers)))
+            elif isinstance(event, h2.events.StreamReset):
+                self.pending.pop(event.stream_id, None)
+            elif isinstance(event, h2.events.ConnectionTerminated):
+                self.transport.close()
+                return
+        self._flush()
+
+    async def _respond(self, stream_id: int, headers: Dict):
+        path = headers.get(":path", "/")
+        await asyncio.sleep(site_latency(self.site, path))
+        if self.transport.is_closing():
+            return
+        status, content_type, body, coding = site_response(self.site, path, headers.get("accept-encoding", ""))
+        response = [(":status", str(status)), ("content-type", content_type), ("content-length", str(len(body)))]
+        if coding:
+            response.append(("content-encoding", coding))
+        self.conn.send_headers(stream_id, response)
+        self.pending[stream_id] = memoryview(body)
+        self._flush()
+
+    def _flush(self):
+        # Send as much of every pending body as the client's flow-control windows allow
+        for stream_id, data in list(self.pending.items()):
+            try:
+                allowed = min(len(data), self.conn.local_flow_control_window(stream_id))
+                while allowed > 0:
+                    size = min(allowed, self.conn.max_outbound_frame_size)
+                    self.conn.send_data(stream_id, data[:size].tobytes())
+                    data, allowed = data[size:], allowed - size
+                if data:
+                    self.pending[stream_id] = data
+                else:
+                    self.conn.end_stream(stream_id)
+                    del self.pending[stream_id]
+            except h2.exceptions.ProtocolError:
+                self.pending.pop(stream_id, None)
+        if not self.transport.is_closing():
+            self.transport.write(self.conn.data_to_send())
+
+# ==================== FAKE SOCKS5 PROXY ====================
+
+async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, counter=None):
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            if counter is not None:
+                with counter.get_lock():
+                    counter.value += len(data)
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+async def _socks_client(reader, writer, delay_ms: float, fail_rate: float, counters):
+    """
+    Minimal SOCKS5 CONNECT (no auth or username/password, so Tor-style isolation credentials work).
+    counters: shared (connections, downstream bytes) values.
+    """
+    connections, downstream = counters
+    with connections.get_lock():
+        connections.value += 1
+    try:
+        _, n_methods = await reader.readexactly(2)
+        methods = await reader.readexactly(n_methods)
+        if 2 in methods:
+            writer.write(b"\x05\x02")
+            await writer.drain()
+            await reader.readexactly(1)
+            await reader.readexactly((await reader.readexactly(1))[0])  # username
+            await reader.readexactly((await reader.readexactly(1))[0])  # password
+            writer.write(b"\x01\x00")
+        else:
+            writer.write(b"\x05\x00")
+        await writer.drain()
+        _, _, _, address_type = await reader.readexactly(4)
+        if address_type == 1:
+            host = ".".join(map(str, await reader.readexactly(4)))
+        elif address_type == 3:
+            host = (await reader.readexactly((await reader.readexactly(1))[0])).decode()
+        else:
+            host = ":".join(f"{a:02x}{b:02x}" for a, b in zip(*[iter(await reader.readexactly(16))] * 2))
+        port = struct.unpack("!H", await reader.readexactly(2))[0]
+        if delay_ms:
+            await asyncio.sleep(max(0.0, random.gauss(delay_ms, delay_ms / 4)) / 1000)
+        if random.random() < fail_rate:
+            writer.write(b"\x05\x01\x00\x01" + bytes(6))  # general SOCKS server failure
+            await writer.drain()
+            writer.close()
+            return
+        upstream_reader, upstream_writer = await asyncio.open_connection(host, port)
+        writer.write(b"\x05\x00\x00\x01" + bytes(6))
+        await writer.drain()
+        await asyncio.gather(_pipe(reader, upstream_writer), _pipe(upstream_reader, writer, downstream))
+    except (asyncio.IncompleteReadError, ConnectionError, OSError):
+        writer.close()
+
+def serve(site: Dict, proxies: int, delay_ms: float, fail_rate: float, counters, ready):
+    """
+    Child process: HTTP site in threads, SOCKS5 proxies (and the HTTP/2 site) on the event loop.
+    Sends the ports through `ready`.
+    """
+    SiteHandler.site = site
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), SiteHandler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    async def main():
+        servers = [await asyncio.start_server(lambda r, w: _socks_client(r, w, delay_ms, fail_rate, counters),
+                                              "127.0.0.1", 0)
+                   for _ in range(proxies)]
+        h2_port = None
+        if site.get("http2"):
+            h2_server = await asyncio.get_running_loop().create_server(lambda: H2SiteProtocol(site), "127.0.0.1", 0)
+            h2_port = h2_server.sockets[0].getsockname()[1]
+        ready.send((httpd.server_address[1], h2_port, [s.sockets[0].getsockname()[1] for s in servers]))
+        await asyncio.Event().wait()
+    asyncio.run(main())
+
+# ==================== MEASUREMENT ====================
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def cpu_seconds() -> Optional[float]:
+    """
+    User + system CPU of this process and its reaped children (the parse pool), or None if unavailable.
+    """
+    if resource is None:
+        return None
+    own, children = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Peak resident memory of the crawler process (parse workers excluded), or None if unavailable.
+    """
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)  # Windows
+    except (ImportError, AttributeError):
+        return None
+
+def run_crawl(scenario: Dict, workers: Optional[int], keep_delays: bool, verbose: bool) -> Dict:
+    """
+    Starts the offline site and proxies, runs Advanced_Crawler.crawl against them and measures it.
+    """
+    import Advanced_Crawler as crawler
+
+    parent, child = multiprocessing.Pipe()
+    site = {k: scenario.get(k) for k in ("pages", "page_kb", "links", "latency_ms", "http2", "compress")}
+    counters = (multiprocessing.Value("l", 0), multiprocessing.Value("q", 0))
+    server = multiprocessing.Process(target=serve, daemon=True,
+                                     args=(site, scenario["proxies"], scenario["proxy_delay_ms"],
+                                           scenario["proxy_fail_rate"], counters, child))
+    server.start()
+    http_port, h2_port, socks_ports = parent.recv()
+    base = f"http://127.0.0.1:{http_port}"
+    # Proxy health checks stay on HTTP/1.1, the crawl itself goes to the HTTP/2 site
+    crawl_base = f"http://127.0.0.1:{h2_port}" if h2_port else base
+
+    latencies, outcomes = [], []
+    fetch_page = crawler.fetch_page
+
+    async def timed_fetch(*args, **kwargs):
+        start = time.perf_counter()
+        ok = False
+        try:
+            result = await fetch_page(*args, **kwargs)
+            ok = result is not None
+            return result
+        finally:
+            latencies.append(time.perf_counter() - start)
+            outcomes.append(ok)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        overrides = {
+            "PROXIES": [f"socks5h://127.0.0.1:{port}" for port in socks_ports],
+            "PROXY_CHECK_URL": f"{base}/ip",
+            "SELENIUM_CRAWL": False, "HYBRID_CRAWL": False, "HTTP_CACHE": False, "RESUME": False,
+            "EXTRA_TOR_INSTANCES": 0, "FOLLOW_EXTERNAL": False,
+            "HTTP2": False, "HTTP2_ONLY": bool(h2_port),
+            "MAX_PAGES": scenario["pages"], "MAX_DEPTH": scenario["pages"],
+            "STATE_DB": os.path.join(tmp, "state.db"), "OUTPUT_PATH": os.path.join(tmp, "results.jsonl"),
+            # The pool is built at import, so swap it for one that caches in the temp dir
+            "HEADER_PROFILES_PATH": os.path.join(tmp, "header_profiles.json"),
+            "HEADER_PROFILE_POOL": crawler.HeaderProfilePool(
+                crawler.HEADERS_POOL, crawler.ACCEPT_LANGUAGES, crawler.REFERERS, crawler.HEADER_PROFILES,
+                os.path.join(tmp, "header_profiles.json"), crawler.HEADER_PROFILES_MAX_AGE),
+            "fetch_page": timed_fetch,
+        }
+        if workers:
+            overrides.update(MAX_CONCURRENCY=workers, MAX_PER_HOST=workers)
+        if scenario.get("rotate"):
+            overrides["ROTATE_FREQUENCY"] = scenario["rotate"]
+        if not keep_delays:
+            # Politeness delays would dominate the measurement (there is a single host), the benchmark
+            # is about crawler overhead
+            overrides.update(HOST_DELAY_MEAN=0, HOST_RATE=None, CIRCUIT_RATE=None)
+        saved = {name: getattr(crawler, name) for name in overrides}
+        for name, value in overrides.items():
+            setattr(crawler, name, value)
+
+        cpu_start = cpu_seconds()
+        start = time.perf_counter()
+        try:
+            with open(os.devnull, "w") as devnull, \
+                    (contextlib.nullcontext() if verbose else contextlib.redirect_stdout(devnull)):
+                asyncio.run(crawler.crawl([f"{crawl_base}/page/0"], num_workers=workers))
+        finally:
+            for name, value in saved.items():
+                setattr(crawler, name, value)
+        wall = time.perf_counter() - start
+        cpu_end = cpu_seconds()
+    server.terminate()
+    server.join()
+
+    pages = sum(outcomes)
+    if not outcomes:
+        print("WARNING: nothing was fetched (did every proxy fail its health check?)")
+    cpu = cpu_end - cpu_start if cpu_start is not None else None
+    return {
+        "pages": pages,
+        "failed": len(outcomes) - pages,  # failed attempts, retried ones included
+        "wall_s": round(wall, 3),
+        "pages_per_sec": round(pages / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "cpu_s": round(cpu, 3) if cpu is not None else None,
+        "cpu_s_per_page": round(cpu / pages, 5) if cpu is not None and pages else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1) if peak_rss_mb() is not None else None,
+        "proxy_connections": counters[0].value,
+        "proxy_mb": round(counters[1].value / (1024 * 1024), 2),
+    }
+
+# ==================== BASELINES ====================
+
+def load_baselines(path: str) -> Dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def compare(name: str, result: Dict, baseline: Optional[Dict], tolerance: float) -> List[str]:
+    """
+    Returns a message for every metric that regressed by more than `tolerance` (fraction) against the baseline.
+    """
+    if not baseline:
+        return []
+    regressions = []
+    for metric, bad in REGRESSION_CHECKS.items():
+        old, new = baseline.get(metric), result.get(metric)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        if (bad == "lower" and change < -tolerance) or (bad == "higher" and change > tolerance):
+            regressions.append(f"{name}: {metric} {old} -> {new} ({change:+.0%})")
+    return regressions
+
+def print_result(name: str, result: Dict, baseline: Optional[Dict]):
+    print(f"\n[{name}] {result['pages']} pages ({result['failed']} failed) in {result['wall_s']}s")
+    for metric in ("pages_per_sec", "p50_ms", "p95_ms", "cpu_s", "cpu_s_per_page", "peak_rss_mb",
+                   "proxy_connections", "proxy_mb"):
+        old = baseline.get(metric) if baseline else None
+        suffix = f"   (baseline {old})" if old is not None else ""
+        print(f"  {metric:<15}{result[metric]!s:>12}{suffix}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline end-to-end crawl benchmark.")
+    parser.add_argument("scenarios", nargs="*", default=["static"],
+                        help=f"Scenarios to run: {', '.join(SCENARIOS)} (default: static)")
+    parser.add_argument("--pages", type=int, help="Pages to crawl")
+    parser.add_argument("--page-kb", type=int, help="Approximate page size in KiB")
+    parser.add_argument("--links", type=int, help="Internal links per page")
+    parser.add_argument("--latency-ms", type=float, help="Mean server latency per page")
+    parser.add_argument("--proxy-delay-ms", type=float, help="Mean delay added to every proxied connection")
+    parser.add_argument("--proxy-fail-rate", type=float, help="Fraction of proxied connections that fail")
+    parser.add_argument("--proxies", type=int, default=1, help="Number of fake SOCKS5 proxies")
+    parser.add_argument("--workers", type=int, help="Crawl workers; also overrides MAX_CONCURRENCY and MAX_PER_HOST (there is one host)")
+    parser.add_argument("--keep-delays", action="store_true", help="Keep the crawler's politeness delays")
+    parser.add_argument("--http2", action="store_true", help="Crawl the site over HTTP/2 (h2c, needs h2)")
+    parser.add_argument("--compress", choices=("gzip", "br", "zstd"), help="Compress pages with this coding")
+    parser.add_argument("--rotate", type=int, help="Overrides ROTATE_FREQUENCY (requests per circuit before renewal)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baselines")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative change before a regression")
+    parser.add_argument("--verbose", action="store_true", help="Show the crawler's output")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    if args.http2 and h2 is None:
+        parser.error('--http2 needs the h2 package (pip install "httpx[http2]")')
+    baselines = load_baselines(args.baseline)
+    regressions = []
+    for name in args.scenarios:
+        scenario = dict(SCENARIOS[name], proxies=args.proxies)
+        for option in ("pages", "page_kb", "links", "latency_ms", "proxy_delay_ms", "proxy_fail_rate"):
+            if getattr(args, option) is not None:
+                scenario[option] = getattr(args, option)
+        if args.http2:
+            scenario["http2"] = True
+        if args.compress:
+            scenario["compress"] = args.compress
+        if args.rotate:
+            scenario["rotate"] = args.rotate
+        # Baselines are only comparable for identical settings, so overrides get their own key
+        defaults = dict(SCENARIOS[name], proxies=1)
+        changed = {k: v for k, v in scenario.items() if defaults.get(k) != v}
+        if args.workers:
+            changed["workers"] = args.workers
+        if args.keep_delays:
+            changed["delays"] = "on"
+        key = name + "".join(f" {k}={v}" for k, v in sorted(changed.items()))
+
+        result = run_crawl(scenario, args.workers, args.keep_delays, args.verbose)
+        baseline = baselines.get(key, {}).get("result")
+        print_result(key, result, baseline)
+        regressions += compare(key, result, baseline, args.tolerance)
+        if args.save_baseline:
+            baselines[key] = {"result": result, "python": platform.python_version(),
+                              "machine": platform.machine(), "cpus": os.cpu_count(),
+                              "saved": time.strftime("%Y-%m-%d %H:%M:%S")}
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"\nBaselines saved to {args.baseline}")
+    if regressions:
+        print("\nREGRESSIONS (beyond {:.0%}):".format(args.tolerance))
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
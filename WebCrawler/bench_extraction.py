@@ -0,0 +1,96 @@
+# Benchmark: legacy multi-pass extraction vs extraction.extract_page
+# Generates synthetic pages, checks both produce the same fields and reports time per page.
+# Usage: py bench_extraction.py [pages] [paragraphs_per_page]
+
+import random
+import sys
+import time
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup
+
+from extraction import PARSER, extract_page
+
+def legacy_extract(html: str, url: str) -> dict:
+    """
+    The extraction block httpx_crawl/selenium_crawl used before extraction.py (kept for comparison).
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    title = soup.title.string.strip() if soup.title else "No title found"
+    quotes = soup.find_all('span', {'class': 'text'})
+    authors = soup.find_all('small', {'class':'author'})
+    domain = urlparse(url).netloc
+    meta_description = soup.find('meta', attrs={'name': 'description'})
+    meta_description = meta_description['content'] if meta_description and 'content' in meta_description.attrs else None
+    meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
+    meta_keywords = meta_keywords['content'] if meta_keywords and 'content' in meta_keywords.attrs else None
+    links = soup.find_all('a', href=True)
+    internal_links = [link['href'] for link in links if urlparse(link['href']).netloc == domain]
+    external_links = [link['href'] for link in links if urlparse(link['href']).netloc and urlparse(link['href']).netloc != domain]
+    images = [{'src': img.get('src'), 'alt': img.get('alt')} for img in soup.find_all('img') if img.get('src')]
+    headings = []
+    for tag in ['h1', 'h2', 'h3']:
+        headings.extend([h.get_text(strip=True) for h in soup.find_all(tag)])
+    paragraphs = [p.get_text(strip=True) for p in soup.find_all('p') if p.get_text(strip=True)]
+    og_data = {meta['property']: meta['content'] for meta in soup.find_all('meta', property=True) if 'content' in meta.attrs}
+    twitter_data = {meta['name']: meta['content'] for meta in soup.find_all('meta', attrs={'name': lambda x: x and x.startswith('twitter:')}) if 'content' in meta.attrs}
+    html_size = len(str(soup).encode('utf-8'))
+    word_count = len(soup.get_text(strip=True).split())
+    return {
+        'url': url, 'title': title, 'quotes_count': len(quotes), 'authors_count': len(authors),
+        'meta_description': meta_description, 'meta_keywords': meta_keywords,
+        'internal_links': internal_links, 'external_links': external_links, 'images': images,
+        'headings': headings, 'paragraphs': paragraphs, 'og_data': og_data,
+        'twitter_data': twitter_data, 'html_size': html_size, 'word_count': word_count
+    }
+
+def synthetic_page(paragraphs: int = 200, seed: int = 0) -> str:
+    """
+    Builds a page resembling a content-heavy article (links, images, headings, quotes, meta tags).
+    """
+    rng = random.Random(seed)
+    words = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor".split()
+    parts = ["<!DOCTYPE html><html><head><title> Synthetic page </title>",
+             '<meta name="description" content="A synthetic page">',
+             '<meta name="keywords" content="bench,crawl">',
+             '<meta property="og:title" content="Synthetic"><meta name="twitter:card" content="summary">',
+             "<style>p { color: red; }</style><script>var x = 1;</script></head><body>"]
+    for i in range(paragraphs):
+        if i % 10 == 0:
+            parts.append(f"<h{i % 3 + 1}>Section {i}</h{i % 3 + 1}>")
+        text = " ".join(rng.choice(words) for _ in range(40))
+        parts.append(f"<div class='quote'><p>{text} <a href='/page/{i}'>internal</a> "
+                     f"<a href='https://other{i % 7}.example/x'>external</a></p>"
+                     f"<span class='text'>quote {i}</span><small class='author'>author {i}</small>"
+                     f"<img src='/img/{i}.png' alt='img {i}'></div>")
+    parts.append("<!-- footer --></body></html>")
+    return "".join(parts)
+
+def bench(fn, pages, url) -> float:
+    start = time.perf_counter()
+    for page in pages:
+        fn(page, url)
+    return (time.perf_counter() - start) / len(pages)
+
+if __name__ == "__main__":
+    n_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    n_paragraphs = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    url = "https://bench.example/article"
+    pages = [synthetic_page(n_paragraphs, seed) for seed in range(n_pages)]
+    raw_pages = [page.encode('utf-8') for page in pages]
+
+    # Sanity check: every field must match except html_size (now taken from raw bytes)
+    # and internal_links (relative links used to be dropped, now they are resolved)
+    old, new = legacy_extract(pages[0], url), extract_page(raw_pages[0], url, parser="html.parser")
+    mismatched = [k for k in old if k not in ('html_size', 'internal_links') and old[k] != new[k]]
+    if mismatched:
+        print(f"WARNING: fields differ from legacy extraction: {mismatched}")
+
+    legacy = bench(legacy_extract, pages, url)
+    single = bench(lambda page, u: extract_page(page, u, parser="html.parser"), raw_pages, url)
+    print(f"Page size: {len(raw_pages[0]) / 1024:.1f} KiB, {n_pages} pages")
+    print(f"legacy (html.parser, multi-pass): {legacy * 1000:8.2f} ms/page")
+    print(f"single-pass (html.parser):        {single * 1000:8.2f} ms/page  ({legacy / single:.2f}x)")
+    if PARSER != "html.parser":
+        fast = bench(extract_page, raw_pages, url)
+        print(f"single-pass ({PARSER}):{' ' * (19 - len(PARSER))}{fast * 1000:8.2f} ms/page  ({legacy / fast:.2f}x)")
@@ -0,0 +1,183 @@
+# Pool of warm Selenium browsers
+# - Drivers are long-lived and grouped by (proxy, user agent) instead of launched per URL
+# - Between pages a driver is isolated by clearing cookies, local/session storage and cache
+# - A free driver on the same proxy can be switched to another user agent via CDP (Chrome)
+# - Drivers are recycled after max_pages pages or when the browser exceeds a memory threshold
+# - Thread-safe: Selenium is blocking, so callers use it from worker threads
+
+# ENSURE PACKAGES EXIST!!!
+# py -m pip install selenium
+# py -m pip install psutil   (optional, enables the memory threshold)
+
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+class _PooledDriver:
+    def __init__(self, driver, proxy: str, user_agent: str):
+        self.driver = driver
+        self.proxy = proxy
+        self.user_agent = user_agent
+        self.pages = 0
+
+class BrowserPool:
+    """
+    Keeps headless browsers warm between pages.
+    Usage:
+        with browsers.driver(proxy, user_agent) as driver:
+            driver.get(url)
+    Args:
+        factory (callable): factory(proxy, user_agent) -> WebDriver or None, e.g. create_browser.
+        max_drivers (int): Max browsers alive at once. Further leases wait for a free one.
+        max_pages (int): Pages a driver serves before it is quit and replaced.
+        max_memory_mb (float): Recycle a driver whose browser processes use more than this (needs psutil).
+    """
+    def __init__(self, factory: Callable, max_drivers: int = 4, max_pages: int = 50,
+                 max_memory_mb: Optional[float] = 1024):
+        self.factory = factory
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.launched = 0
+        self._idle: Dict[Tuple[str, str], List[_PooledDriver]] = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_drivers)
+        self._closed = False
+
+    def _take_idle(self, proxy: str, user_agent: str) -> Optional[_PooledDriver]:
+        with self._lock:
+            same = self._idle.get((proxy, user_agent))
+            if same:
+                return same.pop()
+            # Fall back to any free driver on the same proxy and switch its user agent
+            for (idle_proxy, _), drivers in self._idle.items():
+                if idle_proxy == proxy and drivers:
+                    return drivers.pop()
+        return None
+
+    def _evict_one_idle(self) -> bool:
+        """
+        Quits one idle driver (any key) to free a slot for a different proxy/user agent.
+        """
+        with self._lock:
+            for drivers in self._idle.values():
+                if drivers:
+                    victim = drivers.pop()
+                    break
+            else:
+                return False
+        self._quit(victim)
+        return True
+
+    @staticmethod
+    def _set_user_agent(pooled: _PooledDriver, user_agent: str) -> bool:
+        try:
+            pooled.driver.execute_cdp_cmd("Network.setUserAgentOverride", {"userAgent": user_agent})
+        except Exception:
+            return False
+        pooled.user_agent = user_agent
+        return True
+
+    def _acquire(self, proxy: str, user_agent: str) -> Optional[_PooledDriver]:
+        pooled = self._take_idle(proxy, user_agent)
+        if pooled is not None:
+            if pooled.user_agent == user_agent or self._set_user_agent(pooled, user_agent):
+                return pooled
+            self._quit(pooled)
+        # New browser: wait for a slot, freeing idle drivers of other groups if needed
+        while not self._slots.acquire(timeout=0.5):
+            self._evict_one_idle()
+        driver = self.factory(proxy, user_agent)
+        if driver is None:
+            self._slots.release()
+            return None
+        self.launched += 1
+        return _PooledDriver(driver, proxy, user_agent)
+
+    @contextmanager
+    def driver(self, proxy: str, user_agent: str):
+        """
+        Leases a warm driver for one page.
+        Yields:
+            WebDriver or None: None if the browser could not be launched.
+        """
+        pooled = self._acquire(proxy, user_agent)
+        if pooled is None:
+            yield None
+            return
+        healthy = False
+        try:
+            yield pooled.driver
+            healthy = True
+        finally:
+            pooled.pages += 1
+            if not healthy or self._closed or self._needs_recycle(pooled) or not self._reset(pooled.driver):
+                self._quit(pooled)
+            else:
+                with self._lock:
+                    self._idle.setdefault((pooled.proxy, pooled.user_agent), []).append(pooled)
+
+    def _needs_recycle(self, pooled: _PooledDriver) -> bool:
+        if pooled.pages >= self.max_pages:
+            return True
+        memory = self._memory_mb(pooled.driver)
+        return memory is not None and self.max_memory_mb is not None and memory > self.max_memory_mb
+
+    @staticmethod
+    def _memory_mb(driver) -> Optional[float]:
+        """
+        Resident memory of the driver's browser process tree, or None if psutil is unavailable.
+        """
+        try:
+            import psutil
+            root = psutil.Process(driver.service.process.pid)
+            processes = [root] + root.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _reset(driver) -> bool:
+        """
+        Wipes per-page state so the next page cannot be linked to the previous one.
+        Returns:
+            bool: False if the driver is unusable and should be quit.
+        """
+        try:
+            origin = driver.execute_script(
+                "try { localStorage.clear(); sessionStorage.clear(); } catch (e) {} return location.origin;")
+            try:
+                driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+                driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+                if origin and origin != "null":
+                    driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+            except Exception:
+                # Not Chrome: only the current domain's cookies can be removed
+                driver.delete_all_cookies()
+            driver.get("about:blank")
+            return True
+        except Exception:
+            return False
+
+    def _quit(self, pooled: _PooledDriver):
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+        self._slots.release()
+
+    def close(self):
+        """
+        Quits every idle driver. Drivers still leased are quit when they are returned.
+        """
+        self._closed = True
+        with self._lock:
+            idle = [pooled for drivers in self._idle.values() for pooled in drivers]
+            self._idle = {}
+        for pooled in idle:
+            self._quit(pooled)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,122 @@
+# Fast charset resolution for fetched pages
+# - Resolves the encoding from (in order) a BOM, the Content-Type header and <meta charset>/http-equiv in the
+#   first few KB, so the parser gets bytes plus a known encoding and never has to guess
+# - Undeclared pages: a strict UTF-8 check (fast, C speed), then the host's last known encoding
+# - Statistical detection (charset_normalizer) only when all of that fails; its verdict is cached per host
+# - Labels follow browsers (WHATWG): latin-1/ascii are really windows-1252
+
+import codecs
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from metrics import METRICS
+
+META_SCAN_BYTES = 4096
+BOMS = ((codecs.BOM_UTF8, "utf-8"), (codecs.BOM_UTF16_LE, "utf-16-le"), (codecs.BOM_UTF16_BE, "utf-16-be"))
+HEADER_CHARSET = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.I)
+META_CHARSET = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?([\w.:-]+)", re.I)
+# Browsers decode these as windows-1252, and so do we
+ALIASES = {"iso8859-1": "cp1252", "ascii": "cp1252"}
+
+def normalize(label: Optional[str]) -> Optional[str]:
+    """
+    Maps a charset label to a Python codec name, None if Python does not know it.
+    """
+    if not label:
+        return None
+    try:
+        name = codecs.lookup(label.strip().strip("\"'")).name
+    except LookupError:
+        return None
+    return ALIASES.get(name, name)
+
+def declared_encoding(body: bytes, content_type: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Encoding the page states itself.
+    Args:
+        body (bytes): Raw body (only the first META_SCAN_BYTES are scanned).
+        content_type (str): Content-Type response header.
+    Returns:
+        tuple: (encoding, source) with source "bom", "header" or "meta"; (None, None) if undeclared.
+    """
+    for bom, name in BOMS:
+        if body.startswith(bom):
+            return name, "bom"
+    if content_type:
+        match = HEADER_CHARSET.search(content_type)
+        encoding = normalize(match.group(1)) if match else None
+        if encoding:
+            return encoding, "header"
+    match = META_CHARSET.search(body, 0, META_SCAN_BYTES)
+    if match:
+        encoding = normalize(match.group(1).decode("ascii", "ignore"))
+        # A page that reached us as bytes cannot really be UTF-16 if its meta tag is readable ASCII
+        if encoding and not encoding.startswith("utf-16"):
+            return encoding, "meta"
+    return None, None
+
+def _is_utf8(body: bytes) -> bool:
+    try:
+        body.decode("utf-8")
+    except UnicodeDecodeError:
+        return False
+    return True
+
+def _detect(body: bytes) -> Optional[str]:
+    try:
+        from charset_normalizer import from_bytes
+    except ImportError:
+        return None
+    best = from_bytes(body[:64 * 1024]).best()
+    return normalize(best.encoding) if best else None
+
+class CharsetResolver:
+    """
+    Resolves page encodings, remembering what each host uses.
+    Args:
+        max_hosts (int): Hosts remembered (least recently used are forgotten).
+    """
+    def __init__(self, max_hosts: int = 10_000):
+        self.max_hosts = max_hosts
+        self._hosts: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()  # resolve() runs in worker threads
+
+    def _remember(self, host: str, encoding: str):
+        with self._lock:
+            self._hosts[host] = encoding
+            self._hosts.move_to_end(host)
+            if len(self._hosts) > self.max_hosts:
+                self._hosts.popitem(last=False)
+
+    def resolve(self, host: str, body: bytes, content_type: Optional[str] = None) -> Optional[str]:
+        """
+        Encoding to hand to the parser along with the raw bytes.
+        Blocking (may decode or scan the whole body), so call it off the event loop.
+        Args:
+            host (str): Host the page came from.
+            body (bytes): Raw body.
+            content_type (str): Content-Type response header.
+        Returns:
+            str or None: Codec name, None if nothing could be determined (the parser guesses).
+        """
+        encoding, source = declared_encoding(body, content_type)
+        if encoding is None:
+            if _is_utf8(body):
+                encoding, source = "utf-8", "utf-8"
+            else:
+                with self._lock:
+                    encoding = self._hosts.get(host)
+                source = "host"
+                if encoding is None:
+                    encoding, source = _detect(body), "detected"
+        METRICS.inc("crawl_charset_total", source=source if encoding else "unknown")
+        if encoding is None:
+            return None
+        if source != "utf-8":
+            self._remember(host, encoding)
+        return encoding
+
+# Shared by every fetch in the process
+CHARSETS = CharsetResolver()
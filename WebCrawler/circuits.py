@@ -0,0 +1,185 @@
+# Parallel Tor circuits
+# - Tor builds a separate circuit for every distinct SOCKS username/password pair (IsolateSOCKSAuth,
+#   enabled by default on every SocksPort), so per-worker credentials give each worker its own circuit
+# - Optionally launches extra local tor processes on their own SocksPorts for more capacity
+# - Rotating one circuit just means switching it to fresh credentials, no global NEWNYM needed
+
+# NOTES:
+# Extra tor instances need the tor binary (TOR_PATH) and a writable data directory per instance.
+
+import asyncio
+import os
+import secrets
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+class Circuit:
+    """
+    One isolated Tor circuit, i.e. a SOCKS proxy plus the credentials that isolate it.
+    Args:
+        proxy (str): Base SOCKS proxy, e.g. "socks5h://127.0.0.1:9050".
+        index (int): Position in the pool, used for a stable circuit id.
+        isolated (bool): If False the proxy is used as-is (non-Tor proxies, no isolation).
+    """
+    def __init__(self, proxy: str, index: int, isolated: bool = True):
+        self.proxy = proxy
+        self.index = index
+        self.isolated = isolated
+        self.requests = 0
+        self._key = None
+        if isolated:
+            self.renew()
+
+    @property
+    def id(self) -> str:
+        """
+        Circuit identity: stable slot id plus the current isolation key.
+        """
+        return f"{self.index}:{self._key}" if self.isolated else str(self.index)
+
+    @property
+    def url(self) -> str:
+        """
+        Proxy URL carrying this circuit's isolation credentials.
+        """
+        if not self.isolated:
+            return self.proxy
+        parts = urlsplit(self.proxy)
+        return f"{parts.scheme}://{self._key}:{self._key}@{parts.hostname}:{parts.port}"
+
+    def renew(self):
+        """
+        Switches to fresh credentials, so Tor builds a new circuit for this slot.
+        """
+        self._key = f"crawl{self.index}-{secrets.token_hex(4)}"
+
+class CircuitPool:
+    """
+    Spreads crawl workers across isolated circuits.
+    Args:
+        proxies (list): Base proxies. SOCKS proxies get circuits_per_proxy isolated circuits each.
+        circuits_per_proxy (int): Isolated circuits per SOCKS proxy (0 disables isolation).
+        isolate (iterable): Proxies that are Tor and may be isolated (None: every SOCKS proxy). Other SOCKS
+            proxies are used as-is: a no-auth public proxy rejects the isolation credentials.
+    """
+    def __init__(self, proxies: List[str], circuits_per_proxy: int = 4, isolate: Optional[Iterable[str]] = None):
+        self.circuits: List[Circuit] = []
+        self.by_proxy: Dict[str, List[Circuit]] = {}
+        isolate = None if isolate is None else set(isolate)
+        for proxy in proxies:
+            if (circuits_per_proxy > 0 and proxy and proxy.startswith("socks5")
+                    and (isolate is None or proxy in isolate)):
+                new = [Circuit(proxy, len(self.circuits) + i) for i in range(circuits_per_proxy)]
+            else:
+                new = [Circuit(proxy, len(self.circuits), isolated=False)]
+            self.circuits.extend(new)
+            self.by_proxy.setdefault(proxy, []).extend(new)
+
+    def __len__(self) -> int:
+        return len(self.circuits)
+
+    def for_worker(self, worker_id: int) -> Circuit:
+        """
+        Returns the circuit a worker is pinned to.
+        """
+        return self.circuits[worker_id % len(self.circuits)]
+
+    def on_proxy(self, proxy: str, worker_id: int, exclude: Optional[Circuit] = None) -> Circuit:
+        """
+        Returns the worker's circuit on a given base proxy (e.g. the one the proxy manager picked),
+        so workers sharing a proxy still stay on separate circuits.
+        Args:
+            exclude (Circuit): Circuit to avoid (a retried URL failed on it); the next one on the proxy is used instead.
+        """
+        circuits = self.by_proxy[proxy]
+        circuit = circuits[worker_id % len(circuits)]
+        if circuit is exclude and len(circuits) > 1:
+            circuit = circuits[(worker_id + 1) % len(circuits)]
+        return circuit
+
+class TorInstances:
+    """
+    Launches extra local tor processes, each with its own SocksPort and data directory.
+    Usage:
+        async with TorInstances(2, base_port=9060) as instances:
+            proxies = PROXIES + instances.proxies
+    Args:
+        count (int): Number of tor processes to launch.
+        base_port (int): SocksPort of the first instance, the others count up from it.
+        tor_path (str): Path to the tor binary.
+        data_dir (str): Parent directory for the per-instance DataDirectory.
+        bootstrap_timeout (float): Seconds to wait for each instance to reach "Bootstrapped 100%".
+    """
+    def __init__(self, count: int, base_port: int = 9060, tor_path: str = "tor",
+                 data_dir: str = "tor_data", bootstrap_timeout: float = 90):
+        self.count = count
+        self.base_port = base_port
+        self.tor_path = tor_path
+        self.data_dir = data_dir
+        self.bootstrap_timeout = bootstrap_timeout
+        self.proxies: List[str] = []
+        self._processes: List[asyncio.subprocess.Process] = []
+
+    async def _launch(self, port: int) -> Optional[str]:
+        data_dir = os.path.join(self.data_dir, str(port))
+        os.makedirs(data_dir, exist_ok=True)
+        try:
+            process = await asyncio.create_subprocess_exec(
+                self.tor_path, "--SocksPort", f"{port} IsolateSOCKSAuth", "--ControlPort", "0",
+                "--DataDirectory", data_dir,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+        except OSError as e:
+            print(f"Failed to launch Tor on port {port}: {e}")
+            return None
+        self._processes.append(process)
+        try:
+            await asyncio.wait_for(self._wait_bootstrapped(process), self.bootstrap_timeout)
+        except (asyncio.TimeoutError, EOFError) as e:
+            print(f"Tor on port {port} did not bootstrap: {e!r}")
+            return None
+        print(f"Launched Tor process on SocksPort {port}")
+        return f"socks5h://127.0.0.1:{port}"
+
+    @staticmethod
+    async def _wait_bootstrapped(process: asyncio.subprocess.Process):
+        while True:
+            line = await process.stdout.readline()
+            if not line:
+                raise EOFError("tor exited")
+            if b"Bootstrapped 100%" in line:
+                # Keep draining stdout so tor never blocks on a full pipe
+                asyncio.create_task(TorInstances._drain(process))
+                return
+
+    @staticmethod
+    async def _drain(process: asyncio.subprocess.Process):
+        while await process.stdout.readline():
+            pass
+
+    async def start(self) -> List[str]:
+        """
+        Launches all instances concurrently.
+        Returns:
+            list: Proxy URLs of the instances that bootstrapped.
+        """
+        ports = [self.base_port + i for i in range(self.count)]
+        launched = await asyncio.gather(*(self._launch(port) for port in ports))
+        self.proxies = [proxy for proxy in launched if proxy]
+        return self.proxies
+
+    async def stop(self):
+        """
+        Terminates every launched tor process.
+        """
+        for process in self._processes:
+            if process.returncode is None:
+                process.terminate()
+        await asyncio.gather(*(process.wait() for process in self._processes), return_exceptions=True)
+        self._processes = []
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
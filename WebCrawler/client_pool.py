@@ -0,0 +1,174 @@
+# Long-lived httpx clients shared across requests
+# - One AsyncClient per (proxy, circuit) so keep-alive connections survive between requests
+# - Avoids paying a new SOCKS handshake + TCP connect through Tor + TLS handshake for every URL
+# - Connection pool limits and idle expiry are configurable
+# - Headers are NOT stored on the client; callers pass randomised headers per request
+# - Optional HTTP/2: concurrent requests to a host share one connection (one Tor stream, one TLS handshake)
+# - Accept-Encoding advertises brotli/zstd when their decoders are installed, like a current browser
+
+# ENSURE PACKAGES EXIST!!!
+# py -m pip install --upgrade "httpx[socks]"
+# Optional: py -m pip install "httpx[http2,brotli,zstd]"
+
+import asyncio
+import importlib.util
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+# Decoders httpx can use, in the order browsers list them
+_ENCODINGS = (("gzip", None), ("deflate", None), ("br", ("brotli", "brotlicffi")), ("zstd", ("zstandard",)))
+
+def accept_encoding() -> str:
+    """
+    Accept-Encoding value for every content coding httpx can decode with the installed packages.
+    """
+    return ", ".join(name for name, modules in _ENCODINGS
+                     if modules is None or any(importlib.util.find_spec(m) for m in modules))
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+def new_client(proxy: Optional[str], limits: Optional[httpx.Limits] = None, timeout: float = 10,
+               http2: bool = False, http2_only: bool = False,
+               encoding: Optional[str] = None) -> httpx.AsyncClient:
+    """
+    Creates an httpx client with the crawler's protocol settings.
+    Args:
+        proxy (str): Proxy URL.
+        limits (httpx.Limits): Connection limits (httpx defaults if None).
+        timeout (float): Request timeout in seconds.
+        http2 (bool): Offer HTTP/2 (ALPN on https). Falls back to HTTP/1.1 if h2 is not installed.
+        http2_only (bool): HTTP/2 without negotiation ("prior knowledge"), also for plain http:// (h2c).
+        encoding (str): Accept-Encoding header, defaults to accept_encoding().
+    """
+    if not http2_available():
+        http2 = http2_only = False
+    return httpx.AsyncClient(proxy=proxy, limits=limits or httpx.Limits(), timeout=timeout,
+                             http1=not http2_only, http2=http2 or http2_only,
+                             headers={"Accept-Encoding": encoding or accept_encoding()})
+
+class _PooledClient:
+    """
+    Book-keeping wrapper around an httpx.AsyncClient held by the pool.
+    """
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.last_used = time.monotonic()
+        self.active = 0
+
+class ClientPool:
+    """
+    Pool of long-lived httpx.AsyncClient instances keyed by proxy and circuit identity.
+    Clients that have not been used for idle_expiry seconds are closed on the next sweep.
+    Args:
+        max_connections (int): Max open connections per client.
+        max_keepalive (int): Max idle keep-alive connections per client.
+        keepalive_expiry (float): Seconds an idle connection is kept open by httpx.
+        idle_expiry (float): Seconds an unused client is kept before being closed.
+        timeout (float): Request timeout in seconds.
+        http2 (bool): Offer HTTP/2, so concurrent requests on a circuit share one connection.
+        http2_only (bool): Speak HTTP/2 without negotiation (h2c servers, benchmarks).
+        encoding (str): Accept-Encoding header (default: every coding that can be decoded).
+    """
+    def __init__(self, max_connections: int = 10, max_keepalive: int = 5,
+                 keepalive_expiry: float = 30.0, idle_expiry: float = 300.0, timeout: float = 10,
+                 http2: bool = False, http2_only: bool = False, encoding: Optional[str] = None):
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive,
+                                   keepalive_expiry=keepalive_expiry)
+        self.idle_expiry = idle_expiry
+        self.timeout = timeout
+        if (http2 or http2_only) and not http2_available():
+            print('HTTP/2 needs the h2 package (pip install "httpx[http2]"), using HTTP/1.1')
+        self.http2 = http2
+        self.http2_only = http2_only
+        self.encoding = encoding
+        self._clients: Dict[Tuple[Optional[str], Optional[str]], _PooledClient] = {}
+        self._retired: List[_PooledClient] = []
+        self._lock = asyncio.Lock()
+
+    def _new_client(self, proxy: Optional[str]) -> httpx.AsyncClient:
+        return new_client(proxy, self.limits, self.timeout, self.http2, self.http2_only, self.encoding)
+
+    @asynccontextmanager
+    async def client(self, proxy: Optional[str], circuit: Optional[str] = None):
+        """
+        Leases the pooled client for a proxy/circuit, creating it on first use.
+        Args:
+            proxy (str): Proxy string, e.g. "socks5h://127.0.0.1:9050".
+            circuit (str): Optional circuit identity, so isolated circuits never share connections.
+        Yields:
+            httpx.AsyncClient: The shared client. Do not close it.
+        """
+        key = (proxy, circuit)
+        async with self._lock:
+            await self._sweep()
+            pooled = self._clients.get(key)
+            if pooled is None:
+                pooled = _PooledClient(self._new_client(proxy))
+                self._clients[key] = pooled
+            pooled.active += 1
+        try:
+            yield pooled.client
+        finally:
+            pooled.active -= 1
+            pooled.last_used = time.monotonic()
+
+    async def _sweep(self):
+        """
+        Closes clients that are not in use and have been idle longer than idle_expiry,
+        and retired clients whose last request has finished. Caller must hold the pool lock.
+        """
+        now = time.monotonic()
+        expired = [key for key, pooled in self._clients.items()
+                   if pooled.active == 0 and now - pooled.last_used > self.idle_expiry]
+        for key in expired:
+            await self._clients.pop(key).client.aclose()
+        still_busy = []
+        for pooled in self._retired:
+            if pooled.active == 0:
+                await pooled.client.aclose()
+            else:
+                still_busy.append(pooled)
+        self._retired = still_busy
+
+    async def discard(self, proxy: Optional[str], circuit: Optional[str] = None):
+        """
+        Forgets the client for a proxy/circuit, e.g. after the circuit was rotated.
+        It is closed once its in-flight requests have finished.
+        """
+        async with self._lock:
+            pooled = self._clients.pop((proxy, circuit), None)
+            if pooled:
+                self._retired.append(pooled)
+            await self._sweep()
+
+    async def retire(self, proxy: Optional[str] = None):
+        """
+        Stops handing out the current clients (all of them, or those for one proxy) without
+        interrupting requests in flight. Used after a Tor NEWNYM, since keep-alive connections
+        would otherwise stay on the old circuit. Retired clients are closed once idle.
+        """
+        async with self._lock:
+            keys = [key for key in self._clients if proxy is None or key[0] == proxy]
+            self._retired.extend(self._clients.pop(key) for key in keys)
+            await self._sweep()
+
+    async def aclose(self):
+        """
+        Closes every pooled client.
+        """
+        async with self._lock:
+            clients, self._clients = list(self._clients.values()) + self._retired, {}
+            self._retired = []
+        for pooled in clients:
+            await pooled.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
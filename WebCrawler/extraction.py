@@ -0,0 +1,152 @@
+# Shared page extraction for httpx_crawl and selenium_crawl
+# - Gathers every result field in a single traversal of the parsed document
+# - Parses each link with urlparse only once; relative links are resolved and count as internal
+# - Takes html_size from the raw response bytes instead of re-serialising the tree
+# - Uses the lxml parser backend when it is installed (falls back to html.parser)
+# - Bytes are parsed with the caller's resolved encoding, so BeautifulSoup does not sniff the charset again
+
+# ENSURE PACKAGES EXIST!!!
+# py -m pip install beautifulsoup4 lxml
+
+import importlib.util
+from typing import Dict, Optional, Union
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+# Parser backend handed to BeautifulSoup. lxml is several times faster than html.parser.
+PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+def _meta_content(tag: Tag) -> Optional[str]:
+    return tag.attrs.get('content') if 'content' in tag.attrs else None
+
+def _is_text(node, text_types) -> bool:
+    """
+    Mirrors BeautifulSoup.get_text(): only strings of the document's "interesting"
+    types count as visible text (no comments, scripts, stylesheets, doctypes...).
+    """
+    node_type = type(node)
+    if isinstance(text_types, type):
+        return node_type is text_types
+    return text_types is None or node_type in text_types
+
+def extract_page(html: Union[bytes, str], url: str, status: Optional[int] = None,
+                 title: Optional[str] = None, parser: str = PARSER, encoding: Optional[str] = None) -> Dict:
+    """
+    Parses a page and extracts the crawl result fields in one pass over the document.
+    Args:
+        html (bytes | str): Raw page body. Bytes are preferred, html_size is taken from them directly.
+        url (str): URL the page was fetched from, used to resolve relative links and split internal/external ones.
+        status (int): HTTP status code to include in the result (httpx only).
+        title (str): Title override, e.g. driver.title from Selenium. Defaults to the <title> tag.
+        parser (str): BeautifulSoup parser backend.
+        encoding (str): Known encoding of the bytes (see charsets.py). None lets BeautifulSoup guess.
+    Returns:
+        dict: Result dict with the same fields the crawlers have always produced.
+    """
+    raw = html if isinstance(html, bytes) else html.encode('utf-8')
+    soup = BeautifulSoup(html, parser, from_encoding=encoding if isinstance(html, bytes) else None)
+    domain = urlparse(url).netloc.lower()
+    text_types = soup.interesting_string_types
+
+    base_url = url
+    seen_base = False
+    title_tag = None
+    quotes_count = 0
+    authors_count = 0
+    meta_description = meta_keywords = None
+    seen_description = seen_keywords = False
+    internal_links, external_links = [], []
+    images = []
+    h1, h2, h3 = [], [], []
+    paragraphs = []
+    og_data, twitter_data = {}, {}
+    visible_text = []
+
+    for node in soup.descendants:
+        if not isinstance(node, Tag):
+            if isinstance(node, NavigableString) and _is_text(node, text_types):
+                stripped = node.strip()
+                if stripped:
+                    visible_text.append(stripped)
+            continue
+
+        name = node.name
+        attrs = node.attrs
+        if name == 'a':
+            href = attrs.get('href')
+            if href is not None:
+                parts = urlparse(href)
+                if parts.netloc:
+                    link = href if parts.scheme else urljoin(base_url, href)
+                    if parts.netloc.lower() == domain:
+                        internal_links.append(link)
+                    else:
+                        external_links.append(link)
+                elif not parts.scheme:
+                    # Relative link, resolved against the page (or its <base href>)
+                    internal_links.append(urljoin(base_url, href))
+        elif name == 'p':
+            text = node.get_text(strip=True)
+            if text:
+                paragraphs.append(text)
+        elif name == 'img':
+            if attrs.get('src'):
+                images.append({'src': attrs.get('src'), 'alt': attrs.get('alt')})
+        elif name == 'h1':
+            h1.append(node.get_text(strip=True))
+        elif name == 'h2':
+            h2.append(node.get_text(strip=True))
+        elif name == 'h3':
+            h3.append(node.get_text(strip=True))
+        elif name == 'span':
+            if 'text' in attrs.get('class', ()):
+                quotes_count += 1
+        elif name == 'small':
+            if 'author' in attrs.get('class', ()):
+                authors_count += 1
+        elif name == 'meta':
+            meta_name = attrs.get('name')
+            # Only the first description/keywords tag counts, as with soup.find()
+            if meta_name == 'description' and not seen_description:
+                seen_description = True
+                meta_description = _meta_content(node)
+            elif meta_name == 'keywords' and not seen_keywords:
+                seen_keywords = True
+                meta_keywords = _meta_content(node)
+            elif meta_name and meta_name.startswith('twitter:') and 'content' in attrs:
+                twitter_data[meta_name] = attrs['content']
+            if 'property' in attrs and 'content' in attrs:
+                og_data[attrs['property']] = attrs['content']
+        elif name == 'title' and title_tag is None:
+            title_tag = node
+        elif name == 'base' and attrs.get('href') and not seen_base:
+            seen_base = True
+            base_url = urljoin(url, attrs['href'])
+
+    if title is None:
+        title_string = title_tag.string if title_tag else None
+        title = title_string.strip() if title_string else "No title found"
+
+    result = {
+        'url': url,
+        'title': title,
+        'quotes_count': quotes_count,
+        'authors_count': authors_count,
+    }
+    if status is not None:
+        result['status'] = status
+    result.update({
+        'meta_description': meta_description,
+        'meta_keywords': meta_keywords,
+        'internal_links': internal_links,
+        'external_links': external_links,
+        'images': images,
+        'headings': h1 + h2 + h3,
+        'paragraphs': paragraphs,
+        'og_data': og_data,
+        'twitter_data': twitter_data,
+        'html_size': len(raw),
+        'word_count': len("".join(visible_text).split())
+    })
+    return result
@@ -0,0 +1,239 @@
+# Recursive crawl frontier
+# - Resolves discovered links against the page URL and canonicalises them
+# - Dedups with a Bloom filter (~1.2 bytes per URL at 1% false positives, so tens of millions fit in RAM)
+# - Schedules breadth-first by depth, then by a cheap priority heuristic
+# - Exposes the asyncio.Queue interface (get/task_done/join), so crawl() workers pull from it directly
+# - URLs can be re-queued after a delay (retry backoff, per-host politeness); join() also waits for those
+
+import asyncio
+import hashlib
+import itertools
+import math
+import posixpath
+import re
+from typing import Callable, Iterable, Optional, Set, Tuple
+from urllib.parse import parse_qsl, quote, urlencode, urljoin, urlsplit, urlunsplit
+
+# Query parameters that never change page content (tracking/session ids); dropped during canonicalisation
+IGNORED_QUERY_PARAMS = {
+    "utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content",
+    "fbclid", "gclid", "msclkid", "sessionid", "sid", "phpsessid", "jsessionid",
+}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+ESCAPE = re.compile(r"%([0-9A-Fa-f]{2})")
+LONE_PERCENT = re.compile(r"%(?![0-9A-Fa-f]{2})")
+UNRESERVED = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+
+def _normalize_escape(match) -> str:
+    char = chr(int(match.group(1), 16))
+    return char if char in UNRESERVED else f"%{match.group(1).upper()}"
+
+def canonicalize_url(url: str, base: Optional[str] = None) -> Optional[str]:
+    """
+    Resolves a (possibly relative) link and normalises it so equivalent URLs compare equal:
+    lowercase scheme/host, no default port, no fragment, dot segments removed,
+    tracking/session parameters dropped and the query sorted.
+    Args:
+        url (str): Link as found in the page.
+        base (str): URL of the page the link was found on.
+    Returns:
+        str or None: Canonical URL, or None for non-HTTP links (mailto:, javascript:, ...).
+    """
+    if base:
+        url = urljoin(base, url.strip())
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+    host = parts.hostname.lower().rstrip(".")
+    try:
+        port = parts.port
+    except ValueError:
+        return None
+    netloc = host if port in (None, DEFAULT_PORTS[scheme]) else f"{host}:{port}"
+
+    path = parts.path or "/"
+    trailing = path.endswith("/")
+    path = posixpath.normpath(path)
+    path = "/" if path in (".", "/", "//") else path
+    if trailing and not path.endswith("/"):
+        path += "/"
+    # Escape raw characters that are not allowed, then normalise existing escapes (%7e -> ~, %2f -> %2F).
+    # Reserved escapes stay encoded: /a%2Fb and /a/b are different resources
+    path = ESCAPE.sub(_normalize_escape, quote(LONE_PERCENT.sub("%25", path), safe="/:@!$&'()*+,;=-._~%"))
+
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if k.lower() not in IGNORED_QUERY_PARAMS)
+    # quote (not quote_plus), so %20 stays %20
+    return urlunsplit((scheme, netloc, path, urlencode(query, quote_via=quote), ""))
+
+def link_priority(url: str) -> int:
+    """
+    Cheap priority heuristic: shallow paths first, query-string variants last.
+    Higher is fetched earlier among URLs of the same depth.
+    """
+    parts = urlsplit(url)
+    return -(parts.path.count("/") + (3 if parts.query else 0))
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+    Args:
+        capacity (int): Expected number of items.
+        error_rate (float): Target false positive rate at capacity.
+    """
+    def __init__(self, capacity: int = 10_000_000, error_rate: float = 0.01):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> bool:
+        """
+        Adds an item.
+        Returns:
+            bool: True if the item was (probably) already present.
+        """
+        present = True
+        for pos in self._positions(item):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                present = False
+                self.bits[byte] |= 1 << bit
+        if not present:
+            self.count += 1
+        return present
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos // 8] & (1 << (pos % 8)) for pos in self._positions(item))
+
+class Frontier:
+    """
+    Priority queue of URLs to crawl with Bloom filter dedup.
+    Args:
+        max_depth (int): Links deeper than this (seeds are depth 0) are not scheduled.
+        max_pages (int): Stop scheduling after this many URLs (None for no limit).
+        follow_external (bool): Also schedule links to hosts other than the seed hosts.
+        bloom_capacity (int): Expected number of distinct URLs.
+        bloom_error_rate (float): Bloom filter false positive rate (a false positive skips a URL).
+        on_schedule (callable): Called with (url, depth) for every newly scheduled URL, e.g. to persist it.
+    """
+    def __init__(self, max_depth: int = 2, max_pages: Optional[int] = None, follow_external: bool = False,
+                 bloom_capacity: int = 10_000_000, bloom_error_rate: float = 0.01,
+                 on_schedule: Optional[Callable[[str, int], None]] = None):
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.follow_external = follow_external
+        self.on_schedule = on_schedule
+        self.allowed_hosts: Set[str] = set()
+        self.seen = BloomFilter(bloom_capacity, bloom_error_rate)
+        self.scheduled = 0
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._delayed = 0
+        self._released = asyncio.Event()
+
+    def seed(self, urls: Iterable[str]):
+        """
+        Schedules start URLs at depth 0 and allows links back to their hosts.
+        """
+        for url in urls:
+            canonical = canonicalize_url(url)
+            if canonical:
+                self.allowed_hosts.add(urlsplit(canonical).netloc)
+            self.add(url, 0)
+
+    def add(self, url: str, depth: int, base: Optional[str] = None, priority: Optional[int] = None) -> bool:
+        """
+        Schedules a URL unless it is too deep, off-site, over the page budget or already seen.
+        Args:
+            url (str): Link to schedule (relative links need base).
+            depth (int): Link depth (seed = 0).
+            base (str): Page the link was found on.
+            priority (int): Higher is fetched earlier within a depth. Defaults to link_priority().
+        Returns:
+            bool: True if the URL was scheduled.
+        """
+        if depth > self.max_depth or (self.max_pages is not None and self.scheduled >= self.max_pages):
+            return False
+        canonical = canonicalize_url(url, base)
+        if canonical is None:
+            return False
+        if not self.follow_external and urlsplit(canonical).netloc not in self.allowed_hosts:
+            return False
+        if self.seen.add(canonical):
+            return False
+        if priority is None:
+            priority = link_priority(canonical)
+        self._queue.put_nowait((depth, -priority, next(self._seq), canonical))
+        self.scheduled += 1
+        if self.on_schedule:
+            self.on_schedule(canonical, depth)
+        return True
+
+    def defer(self, url: str, depth: int, delay: float):
+        """
+        Re-queues an already scheduled URL after `delay` seconds, bypassing dedup and the page budget
+        (a retry after backoff, or a host that is not due yet).
+        Nobody waits for the delay: the URL simply reappears on the queue.
+        Args:
+            url (str): Canonical URL as returned by get().
+            depth (int): Its depth.
+            delay (float): Seconds until it is queued again.
+        """
+        self._delayed += 1
+        item = (depth, -link_priority(url), next(self._seq), url)
+        asyncio.get_running_loop().call_later(delay, self._release, item)
+
+    def _release(self, item):
+        self._delayed -= 1
+        self._queue.put_nowait(item)
+        self._released.set()
+
+    def mark_seen(self, url: str):
+        """
+        Records a URL as seen without scheduling it (e.g. pages already done in a previous run).
+        """
+        canonical = canonicalize_url(url)
+        if canonical:
+            self.seen.add(canonical)
+
+    async def get(self) -> Tuple[str, int]:
+        """
+        Waits for the next URL.
+        Returns:
+            tuple: (url, depth)
+        """
+        depth, _, _, url = await self._queue.get()
+        return url, depth
+
+    def task_done(self):
+        self._queue.task_done()
+
+    async def join(self):
+        """
+        Waits until every scheduled URL, including delayed retries, has been processed.
+        """
+        while True:
+            await self._queue.join()
+            if not self._delayed:
+                return
+            self._released.clear()
+            await self._released.wait()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def delayed(self) -> int:
+        """
+        URLs waiting for their delay (retries, politeness).
+        """
+        return self._delayed
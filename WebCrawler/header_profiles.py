@@ -0,0 +1,132 @@
+# Precomputed request header profiles
+# - Each profile is a consistent User-Agent / Accept-Language / Referer set, built once from HEADERS_POOL,
+#   ACCEPT_LANGUAGES, REFERERS and (if installed) a sample of fake_useragent's dataset
+# - Cached to disk as JSON, so later runs skip fake_useragent entirely
+# - Picking headers is a list lookup; a circuit keeps the same profile until its identity changes
+
+import hashlib
+import json
+import os
+import random
+import time
+from typing import Dict, Iterable, List, Optional
+
+class HeaderProfilePool:
+    """
+    Pool of ready-made header sets.
+    Args:
+        headers_pool (list): Hand-written profiles, used as they are.
+        languages (list): Accept-Language values to combine with user agents.
+        referers (list): Referer values to combine with user agents.
+        size (int): Number of profiles to build.
+        path (str): JSON cache file, None to disable caching.
+        max_age (float): Seconds before the cache is rebuilt (fresh user agents).
+        use_fake_useragent (bool): Add user agents sampled from fake_useragent when it is installed.
+        max_identities (int): Identity -> profile assignments kept (see for_identity).
+    """
+    def __init__(self, headers_pool: Iterable[Dict[str, str]], languages: Iterable[str], referers: Iterable[str],
+                 size: int = 200, path: Optional[str] = "header_profiles.json", max_age: float = 7 * 24 * 3600,
+                 use_fake_useragent: bool = True, max_identities: int = 10_000):
+        self.headers_pool = [dict(h) for h in headers_pool]
+        self.languages = list(languages)
+        self.referers = list(referers)
+        self.size = size
+        self.path = path
+        self.max_age = max_age
+        self.use_fake_useragent = use_fake_useragent
+        self.max_identities = max_identities
+        self.profiles: List[Dict[str, str]] = []
+        self._assigned: Dict[str, Dict[str, str]] = {}
+
+    def _fingerprint(self) -> str:
+        # Cache is only valid for the same inputs
+        source = json.dumps([self.headers_pool, self.languages, self.referers, self.size, self.use_fake_useragent],
+                            sort_keys=True)
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+    def _load(self) -> bool:
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("fingerprint") != self._fingerprint() or time.time() - data.get("created", 0) > self.max_age:
+            return False
+        self.profiles = data.get("profiles") or []
+        return bool(self.profiles)
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"fingerprint": self._fingerprint(), "created": time.time(), "profiles": self.profiles}, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Could not cache header profiles to {self.path}: {e}")
+
+    def _sample_user_agents(self, count: int) -> List[str]:
+        if not self.use_fake_useragent:
+            return []
+        try:
+            from fake_useragent import UserAgent  # Heavy dataset, only loaded when the cache is rebuilt
+            ua = UserAgent()
+            data = getattr(ua, "data_browsers", None)  # fake_useragent >= 1.5: sample the dataset in one go
+            if data:
+                agents = random.choices([d["useragent"] for d in data], [d.get("percent", 1) for d in data], k=count * 2)
+            else:
+                agents = [ua.random for _ in range(count * 2)]
+            return list(dict.fromkeys(agents))[:count]
+        except Exception as e:
+            print(f"fake_useragent unavailable, using HEADERS_POOL user agents only: {e}")
+            return []
+
+    def build(self):
+        """
+        Builds the profiles: HEADERS_POOL entries as they are, then user agents combined with a
+        language and referer each (every profile keeps one coherent set for its lifetime).
+        """
+        profiles = [dict(h) for h in self.headers_pool]
+        agents = [h["User-Agent"] for h in self.headers_pool if "User-Agent" in h]
+        agents += [a for a in self._sample_user_agents(self.size) if a not in agents]
+        rng = random.Random()
+        while agents and len(profiles) < self.size:
+            profile = {"User-Agent": rng.choice(agents)}
+            if self.languages:
+                profile["Accept-Language"] = rng.choice(self.languages)
+            if self.referers:
+                profile["Referer"] = rng.choice(self.referers)
+            profiles.append(profile)
+        self.profiles = profiles
+
+    def load(self) -> "HeaderProfilePool":
+        """
+        Loads the cached profiles, or builds and caches them.
+        """
+        if not self._load():
+            self.build()
+            self._save()
+        return self
+
+    def random(self) -> Dict[str, str]:
+        """
+        A random profile (a copy, safe to modify).
+        """
+        if not self.profiles:
+            self.load()
+        return dict(random.choice(self.profiles))
+
+    def for_identity(self, identity: str) -> Dict[str, str]:
+        """
+        The profile bound to an identity, e.g. a circuit id. The same exit keeps presenting the same
+        browser; a renewed circuit (new id) gets a new profile.
+        """
+        profile = self._assigned.get(identity)
+        if profile is None:
+            if len(self._assigned) >= self.max_identities:
+                self._assigned.clear()
+            profile = self._assigned[identity] = self.random()
+        return dict(profile)
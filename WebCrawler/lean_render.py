@@ -0,0 +1,107 @@
+# Lean page loading for Selenium renders
+# - Explicit readiness waits (DOM ready, network idle or a CSS selector) instead of a fixed sleep
+# - Blocks resource types the extractor never uses (images, fonts, stylesheets, media) via the DevTools protocol
+# - Page-load strategy and timeouts are configured on the browser, so a slow asset cannot stall a worker
+# - Works on any driver object with execute_script / execute_cdp_cmd, no extra dependencies
+
+import time
+from typing import Iterable, List, Optional
+
+# URL patterns blocked per resource type (Network.setBlockedURLs takes wildcards, not types)
+RESOURCE_PATTERNS = {
+    "image": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico", "*.bmp"],
+    "font": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"],
+    "stylesheet": ["*.css"],
+    "media": ["*.mp4", "*.webm", "*.ogg", "*.mp3", "*.wav", "*.m4a", "*.mov", "*.m3u8"],
+}
+READY_CONDITIONS = ("dom", "network_idle", "selector")
+
+def blocked_url_patterns(resource_types: Iterable[str]) -> List[str]:
+    """
+    Expands resource types ("image", "font", "stylesheet", "media") to URL wildcard patterns.
+    """
+    patterns = []
+    for resource_type in resource_types:
+        patterns.extend(RESOURCE_PATTERNS.get(resource_type, ()))
+    return patterns
+
+def apply_lean_options(chrome_options, resource_types: Iterable[str], page_load_strategy: str = "eager"):
+    """
+    Adds the launch-time part of lean mode to Chrome options.
+    Args:
+        chrome_options (Options): Chrome options being built by create_browser.
+        resource_types (iterable): Resource types to block.
+        page_load_strategy (str): "normal" (wait for every subresource), "eager" (DOMContentLoaded) or "none".
+    """
+    chrome_options.page_load_strategy = page_load_strategy
+    resource_types = set(resource_types)
+    if "image" in resource_types:
+        # Cheaper than URL patterns: images without a known extension are skipped too
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+    if "media" in resource_types:
+        chrome_options.add_argument("--autoplay-policy=user-gesture-required")
+
+def block_resources(driver, resource_types: Iterable[str]) -> bool:
+    """
+    Blocks requests for the given resource types for the lifetime of the driver (Chrome only).
+    Returns:
+        bool: False if the browser does not speak the DevTools protocol.
+    """
+    patterns = blocked_url_patterns(resource_types)
+    if not patterns:
+        return True
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+        return True
+    except Exception:
+        return False
+
+def _dom_ready(driver) -> bool:
+    return driver.execute_script("return document.readyState") in ("interactive", "complete")
+
+def _resource_count(driver) -> int:
+    return driver.execute_script("return performance.getEntriesByType('resource').length")
+
+def wait_until_ready(driver, condition: str = "dom", selector: Optional[str] = None, timeout: float = 10.0,
+                     idle_time: float = 0.5, poll: float = 0.1) -> bool:
+    """
+    Waits for the page to be ready for extraction instead of sleeping a fixed time.
+    Args:
+        driver (WebDriver): Driver that has just been navigated.
+        condition (str): "dom" (DOMContentLoaded), "network_idle" (DOM ready and no new resource
+            finished loading for idle_time seconds) or "selector" (an element matches selector).
+        selector (str): CSS selector for the "selector" condition.
+        timeout (float): Max seconds to wait.
+        idle_time (float): Quiet period that counts as network idle.
+        poll (float): Polling interval in seconds.
+    Returns:
+        bool: True if the condition was met, False on timeout (the page is usually still worth extracting).
+    """
+    if condition not in READY_CONDITIONS:
+        raise ValueError(f"Unknown ready condition {condition!r}, expected one of {READY_CONDITIONS}")
+    if condition == "selector" and not selector:
+        raise ValueError("The 'selector' ready condition needs a selector")
+
+    deadline = time.monotonic() + timeout
+    last_count, quiet_since = -1, None
+    while True:
+        try:
+            if condition == "selector":
+                if driver.execute_script("return document.querySelector(arguments[0]) !== null", selector):
+                    return True
+            elif _dom_ready(driver):
+                if condition == "dom":
+                    return True
+                count = _resource_count(driver)
+                now = time.monotonic()
+                if count != last_count:
+                    last_count, quiet_since = count, now
+                elif now - quiet_since >= idle_time:
+                    return True
+        except Exception:
+            # The page is navigating or the document is not scriptable yet
+            pass
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(poll)
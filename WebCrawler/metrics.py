@@ -0,0 +1,336 @@
+# Crawl instrumentation
+# - Per-stage latency histograms (SOCKS connect, TLS, time to first byte, download, parse, render,
+#   politeness waits per host/circuit, Tor rotation)
+# - Counters per proxy and circuit, bytes transferred, URLs deferred by the politeness scheduler
+# - Prometheus text exposition on a small HTTP endpoint and/or a periodic stats dump to stdout
+# - Optional sampling profiler that writes collapsed stacks (flamegraph.pl / speedscope input)
+# Thread-safe: Selenium renders record from worker threads.
+
+import asyncio
+import bisect
+import collections
+import math
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional, Tuple
+
+# Upper bounds (seconds) of the histogram buckets, Prometheus style
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _labels(labels: Dict) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+class Histogram:
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates a quantile by linear interpolation inside its bucket (like histogram_quantile()).
+        """
+        if not self.count:
+            return math.nan
+        rank, seen = q * self.count, 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                if i == len(self.bounds):
+                    return lower
+                return lower + (self.bounds[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+class Metrics:
+    """
+    In-process registry of counters and histograms.
+    Usage:
+        METRICS.inc("crawl_requests_total", proxy=proxy, outcome="ok")
+        with METRICS.timer("crawl_stage_seconds", stage="parse"):
+            ...
+    """
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.enabled = True
+        self.started = time.time()
+        self._counters: Dict[str, Dict[Labels, float]] = collections.defaultdict(dict)
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = collections.defaultdict(dict)
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, text: str):
+        self._help[name] = text
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms[name]
+            if key not in series:
+                series[key] = Histogram(self.buckets)
+            series[key].observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """
+        Observes the duration of the block (also when it raises). Works in coroutines and threads.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started = time.time()
+
+    def render(self) -> str:
+        """
+        Prometheus text exposition format (version 0.0.4).
+        """
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+            for name in sorted(self._histograms):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, hist in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(self.buckets + (math.inf,), hist.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == math.inf else f"{bound:g}"
+                        lines.append(f"{name}_bucket{_format_labels(labels, ('le', le))} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {hist.sum:g}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """
+        Short human readable dump: every histogram with count/mean/p50/p95, then the counters.
+        """
+        lines = [f"==== crawl stats ({time.time() - self.started:.0f}s) ===="]
+        with self._lock:
+            for name in sorted(self._histograms):
+                for labels, hist in sorted(self._histograms[name].items()):
+                    label = ",".join(v for _, v in labels) or name
+                    mean = hist.sum / hist.count if hist.count else math.nan
+                    lines.append(f"  {label:<28} n={hist.count:<7} mean={mean * 1000:8.1f}ms "
+                                 f"p50={hist.quantile(0.5) * 1000:8.1f}ms p95={hist.quantile(0.95) * 1000:8.1f}ms")
+            for name in sorted(self._counters):
+                for labels, value in sorted(self._counters[name].items()):
+                    label = " ".join(f"{k}={v}" for k, v in labels)
+                    lines.append(f"  {name} {label} {value:g}")
+        return "\n".join(lines)
+
+# Process-wide registry used by the crawler modules
+METRICS = Metrics()
+METRICS.describe("crawl_stage_seconds", "Time spent per crawl stage.")
+METRICS.describe("crawl_requests_total", "Fetch attempts per proxy, circuit and outcome.")
+METRICS.describe("crawl_bytes_total", "Bytes received per proxy (wire = as transferred, body = decoded).")
+METRICS.describe("crawl_pages_total", "Pages finished per backend and outcome.")
+METRICS.describe("crawl_tor_rotations_total", "Tor NEWNYM attempts per result.")
+METRICS.describe("crawl_circuit_renewals_total", "Isolated circuit credential renewals per proxy.")
+METRICS.describe("crawl_deferrals_total", "URLs put back on the frontier until their host's politeness slot.")
+METRICS.describe("crawl_retries_total", "Failed attempts re-queued for a retry, per failure kind.")
+METRICS.describe("crawl_responses_total", "Responses per HTTP version and content encoding.")
+METRICS.describe("crawl_charset_total", "Page encodings resolved, per source (bom, header, meta, utf-8, host, detected).")
+METRICS.describe("crawl_near_duplicates_total", "Fetched pages found to be near-duplicates of earlier ones (SimHash).")
+
+class RequestTrace:
+    """
+    httpx/httpcore "trace" extension that splits a request into stages:
+    connect (TCP to the proxy), socks (SOCKS handshake, includes Tor circuit setup), tls,
+    ttfb (request sent -> response headers) and download (response body).
+    Usage:
+        trace = RequestTrace()
+        r = await client.get(url, extensions={"trace": trace})
+        trace.record(METRICS)
+    Reused pooled connections simply have no connect/socks/tls stage.
+    """
+    STAGES = {"connect_tcp": "connect", "setup_socks5_connection": "socks", "start_tls": "tls",
+              "receive_response_body": "download"}
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        self._started: Dict[str, float] = {}
+
+    async def __call__(self, event: str, info: Dict):
+        # Events look like "connection.connect_tcp.started" / "http11.receive_response_body.complete"
+        step, _, phase = event.rpartition(".")
+        step = step.rsplit(".", 1)[-1]
+        now = time.perf_counter()
+        if phase == "started":
+            self._started[step] = now
+            if step == "send_request_headers":
+                self._started["ttfb"] = now
+            return
+        start = self._started.pop(step, None)
+        if start is None:
+            return
+        if step in self.STAGES:
+            stage = self.STAGES[step]
+            self.durations[stage] = self.durations.get(stage, 0.0) + now - start
+        elif step == "receive_response_headers" and "ttfb" in self._started:
+            self.durations["ttfb"] = now - self._started.pop("ttfb")
+
+    def record(self, metrics: "Metrics", **labels):
+        for stage, seconds in self.durations.items():
+            metrics.observe("crawl_stage_seconds", seconds, stage=stage, **labels)
+
+class MetricsExporter:
+    """
+    Serves METRICS at http://host:port/metrics and/or prints a summary every dump_interval seconds.
+    Args:
+        metrics (Metrics): Registry to export.
+        port (int): Port of the Prometheus endpoint, None to disable it.
+        dump_interval (float): Seconds between stdout dumps, 0 to disable. A final dump is printed on close.
+        host (str): Interface to bind (localhost by default, the stats reveal what is being crawled).
+    """
+    def __init__(self, metrics: Metrics = METRICS, port: Optional[int] = None, dump_interval: float = 0,
+                 host: str = "127.0.0.1"):
+        self.metrics = metrics
+        self.port = port
+        self.dump_interval = dump_interval
+        self.host = host
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._dump_task: Optional[asyncio.Task] = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await reader.readline()
+            while (await reader.readline()).strip():
+                pass  # Skip request headers
+            path = request.split(b" ")[1] if request.count(b" ") >= 2 else b"/"
+            if path.split(b"?")[0] in (b"/metrics", b"/"):
+                status, body = "200 OK", self.metrics.render().encode("utf-8")
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("ascii") + body)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dump_loop(self):
+        while True:
+            await asyncio.sleep(self.dump_interval)
+            print(self.metrics.summary())
+
+    async def start(self):
+        if self.port is not None:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            print(f"Metrics at http://{self.host}:{self._server.sockets[0].getsockname()[1]}/metrics")
+        if self.dump_interval:
+            self._dump_task = asyncio.create_task(self._dump_loop())
+
+    async def close(self):
+        if self._dump_task is not None:
+            self._dump_task.cancel()
+            await asyncio.gather(self._dump_task, return_exceptions=True)
+            self._dump_task = None
+            print(self.metrics.summary())
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+class SamplingProfiler:
+    """
+    Low-overhead statistical profiler for the hot path: a background thread samples the stack of one
+    thread (the event loop by default) every `interval` seconds and counts identical stacks.
+    The output is in collapsed-stack format ("outer;inner;leaf count"), ready for flamegraph.pl or speedscope.
+    Args:
+        path (str): Output file written on stop.
+        interval (float): Seconds between samples.
+        thread_id (int): Thread to sample. Defaults to the thread that calls start().
+    """
+    def __init__(self, path: str, interval: float = 0.005, thread_id: Optional[int] = None):
+        self.path = path
+        self.interval = interval
+        self.thread_id = thread_id
+        self.samples: Dict[str, int] = collections.Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        with open(self.path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"Profile: {sum(self.samples.values())} samples written to {self.path}")
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,107 @@
+# Near-duplicate page detection (SimHash)
+# - Fingerprints the visible text of a fetched page straight from the raw bytes (regex tag stripping, no parse)
+# - 64-bit SimHash over word 3-shingles: mirrors, session-parameter variants and soft-404s land within a few bits
+# - Index split into 4 bands of 16 bits: any page within 3 bits shares at least one band with its match
+#   (pigeonhole), so a lookup only compares against a handful of candidates
+# - crawl() checks pages before extraction and storage and skips (or marks) near-duplicates
+
+import hashlib
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+HIDDEN = re.compile(rb"<(script|style|noscript|template)\b.*?</\1\s*>|<!--.*?-->", re.I | re.S)
+TAG = re.compile(rb"<[^>]*>")
+ENTITY = re.compile(r"&#?\w+;")
+WORD = re.compile(r"\w+")
+
+def visible_words(body: bytes, encoding: Optional[str] = None) -> List[str]:
+    """
+    Lowercased words of the page's visible text (scripts, styles and comments removed).
+    Approximate on purpose: it only has to be stable between copies of a page, not exact.
+    """
+    text = TAG.sub(b" ", HIDDEN.sub(b" ", body)).decode(encoding or "utf-8", "replace")
+    return WORD.findall(ENTITY.sub(" ", text).lower())
+
+def simhash(words: List[str], shingle: int = 3) -> int:
+    """
+    64-bit SimHash of a word sequence, with overlapping word n-grams as features.
+    """
+    grams = {" ".join(words[i:i + shingle]) for i in range(max(1, len(words) - shingle + 1))}
+    digests = b"".join(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest() for g in grams)
+    # Per-bit counts without a loop over every feature: count the byte values in each of the 8 byte
+    # columns (C speed), then spread each distinct value's count over its set bits
+    counts = [0] * 64
+    for column in range(8):
+        for value, n in Counter(digests[column::8]).items():
+            for bit in range(8):
+                if value & (0x80 >> bit):
+                    counts[column * 8 + bit] += n
+    # Bit i of the fingerprint is set when most features have it set
+    fingerprint = 0
+    for count in counts:
+        fingerprint = (fingerprint << 1) | (count * 2 > len(grams))
+    return fingerprint
+
+def distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+class SimHashIndex:
+    """
+    Fingerprints of the pages seen so far, searchable by Hamming distance.
+    Args:
+        max_distance (int): Differing bits that still count as a near-duplicate (at most 3 with 4 bands).
+        min_words (int): Pages with fewer visible words are not fingerprinted (too little text to compare).
+    """
+    BANDS = 4
+
+    def __init__(self, max_distance: int = 3, min_words: int = 50):
+        self.max_distance = min(max_distance, self.BANDS - 1)
+        self.min_words = min_words
+        self._bands: List[Dict[int, List[Tuple[int, str]]]] = [defaultdict(list) for _ in range(self.BANDS)]
+        self.pages = 0
+        self.duplicates = 0
+
+    def _keys(self, fingerprint: int):
+        return [(fingerprint >> (16 * band)) & 0xFFFF for band in range(self.BANDS)]
+
+    def find(self, fingerprint: int, url: Optional[str] = None) -> Optional[str]:
+        """
+        URL of an indexed page within max_distance bits, other than `url` itself, or None.
+        """
+        for band, key in zip(self._bands, self._keys(fingerprint)):
+            for known, known_url in band.get(key, ()):
+                if known_url != url and distance(fingerprint, known) <= self.max_distance:
+                    return known_url
+        return None
+
+    def add(self, fingerprint: int, url: str):
+        for band, key in zip(self._bands, self._keys(fingerprint)):
+            band[key].append((fingerprint, url))
+        self.pages += 1
+
+    def fingerprint(self, body: bytes, encoding: Optional[str] = None) -> Optional[int]:
+        """
+        SimHash of a page's visible text, None if it has fewer than min_words words.
+        Blocking (regex and hashing over the whole body), so call it off the event loop.
+        """
+        words = visible_words(body, encoding)
+        return simhash(words) if len(words) >= self.min_words else None
+
+    def check(self, url: str, fingerprint: Optional[int]) -> Optional[str]:
+        """
+        Indexes a page unless it is a near-duplicate of one already seen.
+        Args:
+            url (str): Page URL.
+            fingerprint (int): Result of fingerprint() (None is never a duplicate).
+        Returns:
+            str or None: URL of the page this one duplicates, None if it is new.
+        """
+        if fingerprint is None:
+            return None
+        original = self.find(fingerprint, url)
+        if original:
+            self.duplicates += 1
+            return original
+        self.add(fingerprint, url)
+        return None
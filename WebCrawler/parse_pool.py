@@ -0,0 +1,50 @@
+# Parse stage backed by a process pool
+# - Fetch tasks hand raw bytes over and get the extracted result dict back
+# - Parsing runs on other cores, so the event loop keeps servicing network I/O
+# - workers=0 parses inline on the calling thread (old behaviour)
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, Optional, Union
+
+from extraction import extract_page
+
+class ParsePool:
+    """
+    Runs extraction.extract_page in a ProcessPoolExecutor.
+    Args:
+        workers (int): Number of parser processes. 0 disables the pool and parses inline.
+    """
+    def __init__(self, workers: int = 0):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+
+    async def extract(self, html: Union[bytes, str], url: str, **kwargs) -> Dict:
+        """
+        Extracts the result dict for a page without blocking the event loop.
+        Args:
+            html (bytes | str): Raw page body.
+            url (str): URL the page was fetched from.
+            **kwargs: Passed through to extract_page (status, title, parser, encoding).
+        Returns:
+            dict: The extracted result.
+        """
+        if self._executor is None:
+            return extract_page(html, url, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(extract_page, html, url, **kwargs))
+
+    def shutdown(self):
+        """
+        Stops the parser processes. Pending parses are cancelled.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
@@ -0,0 +1,136 @@
+# Per-host politeness scheduling
+# - Every host gets its own Gaussian-jittered spacing between requests (the privacy timing the global
+#   gaussian_delay()/selenium_delay() used to apply) plus a token-bucket rate limit
+# - Optional token bucket per circuit, so a single exit does not hammer the network either
+# - Slots are reserved, not slept on: a URL whose host is not due yet is deferred on the frontier and the
+#   worker moves on to other hosts, so throughput grows with the number of distinct hosts
+
+import random
+import time
+from typing import Dict, Optional
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations instead of blocking.
+    Args:
+        rate (float): Tokens added per second.
+        burst (float): Bucket size (requests allowed back to back).
+    """
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def reserve(self, at: float) -> float:
+        """
+        Takes one token for a request at (or after) monotonic time `at`.
+        Returns:
+            float: Monotonic time at which the request may go.
+        """
+        if at > self.updated:
+            self.tokens = min(self.burst, self.tokens + (at - self.updated) * self.rate)
+            self.updated = at
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return at
+        # In debt: the request goes once the bucket has refilled to zero
+        return self.updated + -self.tokens / self.rate
+
+class HostState:
+    def __init__(self, bucket: Optional[TokenBucket]):
+        self.bucket = bucket
+        self.next_at = 0.0
+
+class PolitenessScheduler:
+    """
+    Reserves request slots per host (and optionally per circuit).
+    Usage:
+        wait = politeness.reserve(url, host)
+        if wait > 0:
+            frontier.defer(url, depth, wait)   # come back when the host is due
+    Args:
+        delay_mean (float): Mean gap between two requests to the same host (seconds).
+        delay_stddev (float): Standard deviation of the gap.
+        delay_min (float): Smallest gap.
+        host_rate (float): Token-bucket rate per host (requests/second), None to disable.
+        host_burst (float): Token-bucket size per host.
+        circuit_rate (float): Token-bucket rate per circuit, None to disable.
+        circuit_burst (float): Token-bucket size per circuit.
+        max_hosts (int): Host states kept before idle ones are dropped.
+    """
+    def __init__(self, delay_mean: float = 3.0, delay_stddev: float = 1.0, delay_min: float = 0.5,
+                 host_rate: Optional[float] = None, host_burst: float = 1.0,
+                 circuit_rate: Optional[float] = None, circuit_burst: float = 1.0, max_hosts: int = 100_000):
+        self.delay_mean = delay_mean
+        self.delay_stddev = delay_stddev
+        self.delay_min = delay_min
+        self.host_rate = host_rate
+        self.host_burst = host_burst
+        self.circuit_rate = circuit_rate
+        self.circuit_burst = circuit_burst
+        self.max_hosts = max_hosts
+        self.deferred = 0
+        self._hosts: Dict[str, HostState] = {}
+        self._circuits: Dict[str, TokenBucket] = {}
+        self._tickets: Dict[str, float] = {}
+
+    def _gap(self) -> float:
+        if self.delay_mean <= 0:
+            return 0.0
+        return max(self.delay_min, random.gauss(self.delay_mean, self.delay_stddev))
+
+    def _host(self, host: str) -> HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            if len(self._hosts) >= self.max_hosts:
+                self._prune()
+            bucket = TokenBucket(self.host_rate, self.host_burst) if self.host_rate else None
+            state = self._hosts[host] = HostState(bucket)
+        return state
+
+    def _prune(self):
+        # Hosts whose schedule is well in the past behave exactly like new ones
+        now = time.monotonic()
+        idle = [host for host, state in self._hosts.items() if state.next_at < now - 60]
+        for host in idle:
+            del self._hosts[host]
+
+    def reserve(self, url: str, host: str) -> float:
+        """
+        Books the next free slot for a request to `host`.
+        A URL that comes back for a slot it already holds is let through.
+        Args:
+            url (str): URL about to be fetched (identifies its reservation).
+            host (str): Target host.
+        Returns:
+            float: Seconds until the slot; 0 means fetch now. Otherwise defer the URL for that long.
+        """
+        now = time.monotonic()
+        ticket = self._tickets.pop(url, None)
+        if ticket is not None and ticket <= now + 0.05:
+            return 0.0
+        state = self._host(host)
+        at = max(now, state.next_at)
+        if state.bucket:
+            at = state.bucket.reserve(at)
+        state.next_at = at + self._gap()
+        if at <= now:
+            return 0.0
+        self._tickets[url] = at
+        self.deferred += 1
+        return at - now
+
+    def circuit_wait(self, circuit: str) -> float:
+        """
+        Takes a token from a circuit's bucket.
+        Returns:
+            float: Seconds the caller has to wait before using the circuit (0 if rate limiting is off).
+        """
+        if not self.circuit_rate:
+            return 0.0
+        bucket = self._circuits.get(circuit)
+        if bucket is None:
+            bucket = self._circuits[circuit] = TokenBucket(self.circuit_rate, self.circuit_burst)
+        now = time.monotonic()
+        return max(0.0, bucket.reserve(now) - now)
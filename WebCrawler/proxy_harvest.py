@@ -0,0 +1,210 @@
+# Multi-source proxy harvester
+# - Queries every configured proxy list concurrently with httpx (no browser, no blocking requests calls)
+# - One parser for all formats: HTML tables (free-proxy-list style), JSON APIs (geonode style) and plain ip:port lists
+# - Results are deduplicated and cached on disk with a TTL, so crawler startup reuses a fresh list
+# - If every source fails, a stale cache is still better than nothing and is used instead
+
+import asyncio
+import json
+import os
+import re
+import time
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+from bs4 import BeautifulSoup
+
+ADDRESS = re.compile(r"\b(\d{1,3}(?:\.\d{1,3}){3}):(\d{2,5})\b")
+SCHEMES = {"http": "http", "https": "http", "socks4": "socks4", "socks5": "socks5"}
+
+class ProxySource:
+    """
+    A public proxy list.
+    Args:
+        name (str): Label used in logs and the cache.
+        url (str): Where the list is downloaded from.
+        protocol (str): Protocol of the listed proxies when the list does not say (http, socks4, socks5).
+    """
+    def __init__(self, name: str, url: str, protocol: str = "http"):
+        self.name = name
+        self.url = url
+        self.protocol = protocol
+
+DEFAULT_SOURCES = [
+    ProxySource("free-proxy-list", "https://free-proxy-list.net/"),
+    ProxySource("sslproxies", "https://www.sslproxies.org/"),
+    ProxySource("geonode", "https://proxylist.geonode.com/api/proxy-list?limit=100&page=1&sort_by=lastChecked&sort_type=desc"),
+    ProxySource("proxyscrape-socks5",
+                "https://api.proxyscrape.com/v2/?request=displayproxies&protocol=socks5&timeout=5000", "socks5"),
+]
+
+def _entry(ip: str, port, protocol: str, https: bool, source: str) -> Optional[Dict]:
+    scheme = SCHEMES.get(str(protocol).strip().lower())
+    port = str(port).strip()
+    if not scheme or not ADDRESS.fullmatch(f"{ip.strip()}:{port}"):
+        return None
+    # The pattern only checks the shape: 999.1.1.1 or port 99999 are not addresses
+    if not 0 < int(port) <= 65535 or any(int(octet) > 255 for octet in ip.strip().split(".")):
+        return None
+    # SOCKS proxies tunnel anything; HTTP proxies only reach https sites if they support CONNECT
+    return {"url": f"{scheme}://{ip.strip()}:{port}", "https": https or scheme != "http", "source": source}
+
+def _parse_table(soup: BeautifulSoup, source: ProxySource) -> List[Dict]:
+    entries = []
+    for table in soup.find_all("table"):
+        headers = [th.get_text(strip=True).lower() for th in table.find_all("th")]
+        ip_col = next((i for i, h in enumerate(headers) if h.startswith("ip")), None)
+        port_col = next((i for i, h in enumerate(headers) if h == "port"), None)
+        if ip_col is None or port_col is None:
+            continue
+        https_col = next((i for i, h in enumerate(headers) if h == "https"), None)
+        protocol_col = next((i for i, h in enumerate(headers) if h in ("protocol", "type")), None)
+        for row in table.find_all("tr"):
+            cols = [td.get_text(strip=True) for td in row.find_all("td")]
+            if len(cols) <= max(ip_col, port_col):
+                continue
+            protocol = cols[protocol_col] if protocol_col is not None and protocol_col < len(cols) else source.protocol
+            https = https_col is not None and https_col < len(cols) and cols[https_col].lower() == "yes"
+            entry = _entry(cols[ip_col], cols[port_col], protocol, https, source.name)
+            if entry:
+                entries.append(entry)
+    return entries
+
+def _parse_json(data, source: ProxySource) -> List[Dict]:
+    if isinstance(data, dict):
+        data = data.get("data") or data.get("proxies") or []
+    entries = []
+    for item in data if isinstance(data, list) else []:
+        if not isinstance(item, dict):
+            continue
+        ip = item.get("ip") or item.get("host") or item.get("address")
+        protocols = item.get("protocols") or item.get("protocol") or item.get("type") or source.protocol
+        if isinstance(protocols, str):
+            protocols = [protocols]
+        for protocol in protocols:
+            entry = _entry(str(ip or ""), item.get("port", ""), protocol, protocol == "https", source.name)
+            if entry:
+                entries.append(entry)
+    return entries
+
+def parse_proxies(text: str, source: ProxySource) -> List[Dict]:
+    """
+    Extracts proxies from a downloaded list, whatever its format.
+    Args:
+        text (str): Response body.
+        source (ProxySource): Where it came from (default protocol, label).
+    Returns:
+        list: {"url": "scheme://ip:port", "https": bool, "source": name} entries.
+    """
+    stripped = text.lstrip()
+    if stripped[:1] in ("{", "["):
+        try:
+            return _parse_json(json.loads(stripped), source)
+        except ValueError:
+            pass
+    if "<table" in text.lower():
+        return _parse_table(BeautifulSoup(text, "html.parser"), source)
+    entries = (_entry(ip, port, source.protocol, False, source.name) for ip, port in ADDRESS.findall(text))
+    return [entry for entry in entries if entry]
+
+class ProxyHarvester:
+    """
+    Collects proxies from several public lists at once and caches them.
+    Usage:
+        proxies = await ProxyHarvester().get()
+    Args:
+        sources (list): ProxySource entries to query.
+        cache_path (str): JSON cache file, None to disable caching.
+        ttl (float): Seconds a cached list stays fresh.
+        timeout (float): Per-source request timeout.
+        protocols (iterable): Proxy schemes to return (http, socks4, socks5).
+        https_only (bool): Only return proxies that can reach https sites.
+        limit (int): Max proxies returned (None for all).
+    """
+    def __init__(self, sources: Optional[List[ProxySource]] = None, cache_path: Optional[str] = "proxy_cache.json",
+                 ttl: float = 1800, timeout: float = 15, protocols: Iterable[str] = ("http", "socks5"),
+                 https_only: bool = True, limit: Optional[int] = None):
+        self.sources = DEFAULT_SOURCES if sources is None else sources
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.timeout = timeout
+        self.protocols = set(protocols)
+        self.https_only = https_only
+        self.limit = limit
+
+    async def _fetch(self, client: httpx.AsyncClient, source: ProxySource) -> List[Dict]:
+        try:
+            response = await client.get(source.url)
+            response.raise_for_status()
+            entries = parse_proxies(response.text, source)
+            print(f"Harvested {len(entries)} proxies from {source.name}")
+            return entries
+        except Exception as e:
+            print(f"Proxy source {source.name} failed: {type(e).__name__}: {e}")
+            return []
+
+    async def harvest(self) -> List[Dict]:
+        """
+        Downloads and parses every source concurrently, dedupes by proxy URL and refreshes the cache.
+        Returns:
+            list: All harvested entries (unfiltered).
+        """
+        headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                                 "Chrome/124.0.0.0 Safari/537.36"}
+        async with httpx.AsyncClient(timeout=self.timeout, headers=headers, follow_redirects=True) as client:
+            results = await asyncio.gather(*(self._fetch(client, source) for source in self.sources))
+        entries: Dict[str, Dict] = {}
+        for entry in (e for result in results for e in result):
+            known = entries.setdefault(entry["url"], entry)
+            known["https"] = known["https"] or entry["https"]
+        entries = list(entries.values())
+        if entries:
+            self._save(entries)
+        return entries
+
+    def _load(self, max_age: Optional[float]) -> Optional[List[Dict]]:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if max_age is not None and time.time() - data.get("created", 0) > max_age:
+            return None
+        return data.get("proxies") or None
+
+    def _save(self, entries: List[Dict]):
+        if not self.cache_path:
+            return
+        tmp = f"{self.cache_path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"created": time.time(), "proxies": entries}, f)
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            print(f"Could not cache proxies to {self.cache_path}: {e}")
+
+    def _select(self, entries: List[Dict]) -> List[str]:
+        proxies = [e["url"] for e in entries
+                   if e["url"].split("://", 1)[0] in self.protocols and (e["https"] or not self.https_only)]
+        return proxies[:self.limit] if self.limit is not None else proxies
+
+    async def get(self, refresh: bool = False) -> List[str]:
+        """
+        Proxy URLs from the cache if it is fresh, otherwise from a new harvest.
+        Args:
+            refresh (bool): Ignore the cache and harvest again.
+        Returns:
+            list: Proxy URLs, e.g. "http://1.2.3.4:8080" or "socks5://1.2.3.4:1080".
+        """
+        entries = None if refresh else self._load(self.ttl)
+        if entries is None:
+            entries = await self.harvest() or self._load(None) or []
+        return self._select(entries)
+
+    def get_sync(self, refresh: bool = False) -> List[str]:
+        """
+        Blocking get() for scripts without an event loop.
+        """
+        return asyncio.run(self.get(refresh))
@@ -0,0 +1,252 @@
+# Async proxy health manager
+# - Health checks use httpx (truly async), so every proxy is checked concurrently
+# - Tracks rolling latency and error rate per proxy from real crawl traffic
+# - Routes requests to the fastest healthy proxies (weighted, so load still spreads)
+# - Ejects failing proxies (circuit breaker) and re-probes them in the background
+
+# ENSURE PACKAGES EXIST!!!
+# py -m pip install --upgrade "httpx[socks]"
+
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+def proxy_key(proxy: Optional[str]) -> Optional[str]:
+    """
+    Strips credentials from a proxy URL, so every isolated circuit on a proxy shares its stats.
+    """
+    if not proxy:
+        return proxy
+    parts = urlsplit(proxy)
+    if parts.username is None:
+        return proxy
+    return f"{parts.scheme}://{parts.hostname}:{parts.port}"
+
+class ProxyStats:
+    """
+    Rolling health statistics for one proxy.
+    """
+    def __init__(self, window: int):
+        self.samples = deque(maxlen=window)   # (latency seconds, ok)
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until: Optional[float] = None
+
+    @property
+    def latency(self) -> Optional[float]:
+        latencies = [latency for latency, ok in self.samples if ok]
+        return sum(latencies) / len(latencies) if latencies else None
+
+    @property
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+class ProxyManager:
+    """
+    Keeps per-proxy health, picks proxies for requests and ejects/re-probes failing ones.
+    Args:
+        proxies (list): Proxy strings to manage.
+        check_url (str): URL used for health checks, must return JSON with an "ip" or "origin" field.
+        window (int): Number of recent requests used for latency and error rate.
+        eject_after (int): Consecutive failures that eject a proxy.
+        max_error_rate (float): Error rate (over a full window) that ejects a proxy.
+        cooldown (float): Seconds before an ejected proxy is re-probed. Doubles on repeated ejections.
+        probe_interval (float): Seconds between background probe rounds.
+        timeout (float): Health check timeout in seconds.
+    """
+    def __init__(self, proxies: List[str], check_url: str = "https://httpbin.org/ip", window: int = 20,
+                 eject_after: int = 3, max_error_rate: float = 0.5, cooldown: float = 30,
+                 probe_interval: float = 10, timeout: float = 10):
+        self.proxies = list(proxies)
+        self.check_url = check_url
+        self.window = window
+        self.eject_after = eject_after
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        self.probe_interval = probe_interval
+        self.timeout = timeout
+        self.stats: Dict[str, ProxyStats] = {proxy_key(p): ProxyStats(window) for p in self.proxies}
+        self._healthy_event = asyncio.Event()
+        self._probe_task: Optional[asyncio.Task] = None
+
+    async def check(self, proxy: str) -> bool:
+        """
+        Tests whether a proxy is functional by requesting check_url through it and records the result.
+        Args:
+            proxy (str): Proxy string in format "http://ip:port" or "socks5://ip:port".
+        Returns:
+            bool: True if proxy works, False otherwise.
+        """
+        start = time.monotonic()
+        try:
+            async with httpx.AsyncClient(proxy=proxy, timeout=self.timeout) as client:
+                response = await client.get(self.check_url)
+            # Check if response is JSON
+            if 'application/json' not in response.headers.get('content-type', ''):
+                print(f"Proxy {proxy} returned non-JSON response: {response.text[:100]}")
+                ok = False
+            else:
+                json_data = response.json()
+                origin_ip = json_data.get('ip') or json_data.get('origin')
+                if origin_ip:
+                    print(f"Proxy {proxy} is working. Origin IP: {origin_ip} ({time.monotonic() - start:.2f}s)")
+                ok = bool(origin_ip)
+                if not ok:
+                    print(f"Proxy {proxy} response lacks IP field: {json_data}")
+        except Exception as e:
+            print(f"Proxy test failed for {proxy}: {e}")
+            ok = False
+        self.record(proxy, time.monotonic() - start, ok)
+        return ok
+
+    async def check_all(self) -> List[str]:
+        """
+        Checks every proxy concurrently.
+        Returns:
+            list: Proxies that passed the check.
+        """
+        results = await asyncio.gather(*(self.check(proxy) for proxy in self.proxies))
+        return [proxy for proxy, ok in zip(self.proxies, results) if ok]
+
+    def record(self, proxy: str, latency: float, ok: bool):
+        """
+        Records the outcome of a request made through a proxy.
+        Args:
+            proxy (str): Proxy (or circuit) URL the request went through.
+            latency (float): Seconds the request took.
+            ok (bool): False for transport level failures (connect, SOCKS, timeouts).
+        """
+        stats = self.stats.get(proxy_key(proxy))
+        if stats is None:
+            return
+        stats.samples.append((latency, ok))
+        if ok:
+            stats.consecutive_failures = 0
+            if stats.ejected_until is not None:
+                self._reinstate(proxy_key(proxy), stats)
+            return
+        stats.consecutive_failures += 1
+        full_window = len(stats.samples) == stats.samples.maxlen
+        if stats.ejected_until is None and (stats.consecutive_failures >= self.eject_after
+                                            or (full_window and stats.error_rate > self.max_error_rate)):
+            self._eject(proxy_key(proxy), stats)
+
+    def _eject(self, key: str, stats: ProxyStats):
+        stats.ejections += 1
+        delay = min(self.cooldown * 2 ** (stats.ejections - 1), self.cooldown * 32)
+        stats.ejected_until = time.monotonic() + delay
+        print(f"Ejected proxy {key} for {delay:.0f}s (error rate {stats.error_rate:.0%})")
+        if not self.healthy():
+            self._healthy_event.clear()
+
+    def _reinstate(self, key: str, stats: ProxyStats):
+        stats.ejected_until = None
+        stats.samples.clear()
+        print(f"Proxy {key} is healthy again")
+        self._healthy_event.set()
+
+    def is_healthy(self, proxy: str) -> bool:
+        stats = self.stats.get(proxy_key(proxy))
+        return stats is not None and stats.ejected_until is None
+
+    def healthy(self) -> List[str]:
+        """
+        Returns the proxies that are not ejected.
+        """
+        return [proxy for proxy in self.proxies if self.is_healthy(proxy)]
+
+    def _score(self, proxy: str, default_latency: float) -> float:
+        stats = self.stats[proxy_key(proxy)]
+        latency = stats.latency if stats.latency is not None else default_latency
+        return latency * (1 + 4 * stats.error_rate)
+
+    def pick(self, exclude: Optional[str] = None) -> Optional[str]:
+        """
+        Picks a healthy proxy, favouring low latency and low error rate.
+        Selection is weighted (1 / score) rather than always the fastest, so traffic still spreads.
+        Args:
+            exclude (str): Proxy to avoid (e.g. the one a retried URL just failed on), unless it is the only healthy one.
+        Returns:
+            str or None: A proxy, or None if every proxy is ejected.
+        """
+        candidates = self.healthy()
+        if not candidates:
+            return None
+        if exclude is not None:
+            others = [p for p in candidates if proxy_key(p) != proxy_key(exclude)]
+            candidates = others or candidates
+        known = [self.stats[proxy_key(p)].latency for p in candidates if self.stats[proxy_key(p)].latency]
+        default_latency = sum(known) / len(known) if known else 1.0
+        weights = [1 / max(self._score(p, default_latency), 1e-3) for p in candidates]
+        return random.choices(candidates, weights=weights)[0]
+
+    async def _wait_healthy(self, exclude: Optional[str]) -> str:
+        while True:
+            proxy = self.pick(exclude)
+            if proxy is not None:
+                return proxy
+            self._healthy_event.clear()
+            await self._healthy_event.wait()
+
+    async def acquire(self, exclude: Optional[str] = None, timeout: Optional[float] = None) -> str:
+        """
+        Like pick(), but waits until a proxy is healthy again if all of them are ejected.
+        Args:
+            exclude (str): Proxy to avoid if another one is healthy.
+            timeout (float): Max seconds to wait (None waits for ever).
+        Raises:
+            asyncio.TimeoutError: No proxy recovered within timeout.
+        """
+        proxy = self.pick(exclude)
+        if proxy is not None:
+            return proxy
+        return await asyncio.wait_for(self._wait_healthy(exclude), timeout)
+
+    async def _probe_loop(self):
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            now = time.monotonic()
+            due = [proxy for proxy in self.proxies
+                   if self.stats[proxy_key(proxy)].ejected_until is not None
+                   and self.stats[proxy_key(proxy)].ejected_until <= now]
+            for proxy, ok in zip(due, await asyncio.gather(*(self.check(p) for p in due))):
+                stats = self.stats[proxy_key(proxy)]
+                if not ok and stats.ejected_until is not None:
+                    # Still failing: back off further before the next probe
+                    self._eject(proxy_key(proxy), stats)
+
+    async def start(self) -> List[str]:
+        """
+        Runs the initial health check and starts background re-probing.
+        Returns:
+            list: Proxies that passed the initial check.
+        """
+        working = await self.check_all()
+        for proxy in self.proxies:
+            stats = self.stats[proxy_key(proxy)]
+            if proxy not in working and stats.ejected_until is None:
+                self._eject(proxy_key(proxy), stats)
+        if working:
+            self._healthy_event.set()
+        self._probe_task = asyncio.create_task(self._probe_loop())
+        return working
+
+    async def stop(self):
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            await asyncio.gather(self._probe_task, return_exceptions=True)
+            self._probe_task = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
@@ -0,0 +1,108 @@
+# Hybrid fetch policy: static httpx first, Selenium only for client-rendered pages
+# - Cheap checks on the static HTML: almost no text next to scripts, empty SPA mount points
+#   (<div id="root"></div>, ...), "enable JavaScript" notices and missing configured selectors
+# - The decision is remembered per host, so later pages on an escalated host go straight to the browser
+# - A host is only escalated after a browser render of it worked, and a failed render demotes it again
+
+import re
+from typing import Dict, Iterable, Optional, Set
+
+from bs4 import BeautifulSoup
+
+from extraction import PARSER
+
+SCRIPT_TAG = re.compile(rb"<script\b", re.IGNORECASE)
+# Empty mount points of the common client-side frameworks (React, Vue, Next, Nuxt, Angular, Svelte, Ember)
+EMPTY_APP_ROOT = re.compile(
+    rb"<(?:div|main|app-root)\b[^>]*\bid\s*=\s*[\"']?(?:root|app|__next|__nuxt|svelte|ember-app|app-root)[\"']?[^>]*>"
+    rb"\s*(?:<!--.*?-->\s*)?</(?:div|main|app-root)>",
+    re.IGNORECASE | re.DOTALL)
+NOSCRIPT_NOTICE = re.compile(
+    rb"<noscript\b[^>]*>[^<]*(?:<[^/][^>]*>[^<]*)*(?:enable|requires?|turn on|need)\s+javascript",
+    re.IGNORECASE)
+
+class RenderPolicy:
+    """
+    Decides when a page fetched with httpx has to be re-rendered in a browser.
+    Args:
+        min_words (int): Pages with fewer visible words than this, but with scripts, look client-rendered.
+        shell_words (int): An empty app mount point only counts if the page has fewer words than this.
+        selectors (dict): Host -> CSS selectors that must match the static HTML, e.g. {"example.com": ["div.price"]}.
+            The "*" key applies to every host.
+        escalate_after (int): Client-rendered pages seen on a host before all its pages go to the browser.
+    """
+    def __init__(self, min_words: int = 50, shell_words: int = 200,
+                 selectors: Optional[Dict[str, Iterable[str]]] = None, escalate_after: int = 1):
+        self.min_words = min_words
+        self.shell_words = shell_words
+        self.selectors = {host.lower(): list(sel) for host, sel in (selectors or {}).items()}
+        self.escalate_after = escalate_after
+        self.rendered_hosts: Set[str] = set()
+        self._hits: Dict[str, int] = {}
+
+    def _selectors_for(self, host: str):
+        return self.selectors.get(host, []) + self.selectors.get("*", [])
+
+    def reason(self, body: bytes, result: Dict, host: str, encoding: Optional[str] = None) -> Optional[str]:
+        """
+        Looks for signs that a static page is a client-rendered shell.
+        Blocking (regex, and a parse when selectors are configured), so call it off the event loop.
+        Args:
+            body (bytes): Raw response body.
+            result (dict): extract_page() result for the body.
+            host (str): Lowercase host of the page.
+            encoding (str): Resolved encoding of the body, if known.
+        Returns:
+            str or None: Why the page needs a browser, or None if the static HTML is good enough.
+        """
+        words = result.get('word_count', 0)
+        if words < self.min_words and SCRIPT_TAG.search(body):
+            return f"{words} words of text next to scripts"
+        if words < self.shell_words and EMPTY_APP_ROOT.search(body):
+            return "empty app mount point"
+        if NOSCRIPT_NOTICE.search(body):
+            return "page asks for JavaScript"
+        selectors = self._selectors_for(host)
+        if selectors:
+            soup = BeautifulSoup(body, PARSER, from_encoding=encoding)
+            missing = [sel for sel in selectors if soup.select_one(sel) is None]
+            if missing:
+                return f"missing {', '.join(missing)}"
+        return None
+
+    def should_render(self, host: str) -> bool:
+        """
+        True if pages on this host skip httpx and go straight to the browser.
+        """
+        return host in self.rendered_hosts
+
+    def flag(self, host: str):
+        """
+        Records a client-rendered page on a host (see escalate()).
+        """
+        self._hits[host] = self._hits.get(host, 0) + 1
+
+    def escalate(self, host: str) -> bool:
+        """
+        Called after a browser render of the host succeeded: switches the host to browser rendering once
+        escalate_after client-rendered pages were flagged on it, so a host never goes browser-only before
+        the browser has worked for it.
+        Returns:
+            bool: True if the host has just been switched to browser rendering.
+        """
+        if self._hits.get(host, 0) >= self.escalate_after and host not in self.rendered_hosts:
+            self.rendered_hosts.add(host)
+            return True
+        return False
+
+    def demote(self, host: str) -> bool:
+        """
+        Called after a browser render failed: the host goes back to httpx first and has to be flagged again.
+        Returns:
+            bool: True if the host was being rendered only.
+        """
+        self._hits.pop(host, None)
+        if host in self.rendered_hosts:
+            self.rendered_hosts.discard(host)
+            return True
+        return False
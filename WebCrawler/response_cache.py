@@ -0,0 +1,155 @@
+# On-disk HTTP response cache with conditional revalidation
+# - Stores zlib-compressed bodies with their validators (ETag / Last-Modified) in SQLite
+# - Refetches send If-None-Match / If-Modified-Since; a 304 is answered from the cache
+# - Size capped, least recently used entries are evicted first
+# - Blocking SQLite/zlib work runs in a worker thread, off the event loop
+
+import asyncio
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url           TEXT PRIMARY KEY,
+    etag          TEXT,
+    last_modified TEXT,
+    content_type  TEXT,
+    body          BLOB NOT NULL,
+    size          INTEGER NOT NULL,
+    last_access   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_lru ON responses(last_access);
+"""
+
+class CachedResponse:
+    """
+    A cached body plus the validators needed to revalidate it.
+    """
+    def __init__(self, url: str, etag: Optional[str], last_modified: Optional[str],
+                 content_type: Optional[str], body: bytes):
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_type = content_type
+        self.body = body
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """
+        Headers that turn a refetch into a conditional request.
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+class ResponseCache:
+    """
+    SQLite backed response cache with LRU eviction.
+    Args:
+        path (str): Database file.
+        max_bytes (int): Cap on the total compressed size of cached bodies.
+        level (int): zlib compression level.
+    """
+    def __init__(self, path: str = "http_cache.db", max_bytes: int = 512 * 1024 * 1024, level: int = 6):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.level = level
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._total = 0
+
+    def open(self):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _lookup(self, url: str) -> Optional[CachedResponse]:
+        with self._lock:
+            row = self._conn.execute("SELECT etag, last_modified, content_type, body FROM responses WHERE url = ?",
+                                     (url,)).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, content_type, body = row
+        return CachedResponse(url, etag, last_modified, content_type, zlib.decompress(body))
+
+    async def lookup(self, url: str) -> Optional[CachedResponse]:
+        """
+        Returns the cached entry for a URL, or None.
+        """
+        return await asyncio.to_thread(self._lookup, url)
+
+    def _touch(self, url: str):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), url))
+
+    async def hit(self, url: str):
+        """
+        Records that a cached entry was served (304), which keeps it from being evicted.
+        """
+        self.hits += 1
+        await asyncio.to_thread(self._touch, url)
+
+    def _store(self, url: str, etag: Optional[str], last_modified: Optional[str],
+               content_type: Optional[str], body: bytes):
+        compressed = zlib.compress(body, self.level)
+        with self._lock, self._conn:
+            old = self._conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            self._conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               (url, etag, last_modified, content_type, compressed, len(compressed), time.time()))
+            self._total += len(compressed) - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """
+        Drops least recently used entries until the cache is back under 90% of max_bytes.
+        Caller must hold the lock and an open transaction.
+        """
+        target = self.max_bytes * 0.9
+        while self._total > target:
+            oldest = self._conn.execute("SELECT url, size FROM responses ORDER BY last_access LIMIT 256").fetchall()
+            if not oldest:
+                break
+            for url, size in oldest:
+                if self._total <= target:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self._total -= size
+
+    async def store(self, url: str, headers, body: bytes) -> bool:
+        """
+        Caches a 200 response if it carries a validator and may be stored.
+        Args:
+            url (str): Request URL.
+            headers (Mapping): Response headers.
+            body (bytes): Raw (decoded transfer/content-encoding) body.
+        Returns:
+            bool: True if the response was cached.
+        """
+        self.misses += 1
+        etag, last_modified = headers.get("etag"), headers.get("last-modified")
+        if not (etag or last_modified) or "no-store" in headers.get("cache-control", "").lower():
+            return False
+        await asyncio.to_thread(self._store, url, etag, last_modified, headers.get("content-type"), body)
+        return True
+
+    async def __aenter__(self):
+        await asyncio.to_thread(self.open)
+        return self
+
+    async def __aexit__(self, *exc):
+        await asyncio.to_thread(self.close)
@@ -0,0 +1,257 @@
+# Columnar results store (Parquet segments + SQLite index)
+# - ParquetSink writes results as zstd-compressed Parquet segments: append-only, one file per flush,
+#   rows sorted by domain/URL so row-group statistics let readers skip what they do not need
+# - A small SQLite index maps every URL (and its domain) to its segment and row
+# - ResultsStore reads only the requested columns, and only the row groups holding the requested rows
+# - Fields the schema does not know are kept as JSON in an "extra" column
+
+# ENSURE PACKAGES EXIST!!!
+# py -m pip install pyarrow
+
+import json
+import os
+import sqlite3
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from sinks import ResultSink
+
+INDEX_FILE = "index.db"
+SEGMENT_PREFIX = "part-"
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url      TEXT NOT NULL,
+    domain   TEXT NOT NULL,
+    segment  TEXT NOT NULL,
+    row      INTEGER NOT NULL,
+    crawled  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_url ON pages(url);
+CREATE INDEX IF NOT EXISTS pages_domain ON pages(domain);
+"""
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError('The parquet results store needs pyarrow (pip install pyarrow)') from e
+    return pyarrow, pyarrow.parquet
+
+def result_schema(pa):
+    """
+    Arrow schema of a stored result (the fields extraction.extract_page produces).
+    """
+    text_list = pa.list_(pa.string())
+    return pa.schema([
+        ("url", pa.string()),
+        ("domain", pa.string()),
+        ("crawled_at", pa.timestamp("ms", tz="UTC")),
+        ("status", pa.int32()),
+        ("title", pa.string()),
+        ("quotes_count", pa.int32()),
+        ("authors_count", pa.int32()),
+        ("meta_description", pa.string()),
+        ("meta_keywords", pa.string()),
+        ("internal_links", text_list),
+        ("external_links", text_list),
+        ("images", pa.list_(pa.struct([("src", pa.string()), ("alt", pa.string())]))),
+        ("headings", text_list),
+        ("paragraphs", text_list),
+        ("og_data", pa.map_(pa.string(), pa.string())),
+        ("twitter_data", pa.map_(pa.string(), pa.string())),
+        ("html_size", pa.int64()),
+        ("word_count", pa.int64()),
+        ("duplicate_of", pa.string()),
+        ("extra", pa.string()),
+    ])
+
+def _row(result: Dict, crawled_at: float, fields: Iterable[str]) -> Dict:
+    row = {name: result.get(name) for name in fields}
+    row["domain"] = urlparse(result.get("url") or "").netloc.lower()
+    row["crawled_at"] = int(crawled_at * 1000)
+    for name in ("og_data", "twitter_data"):
+        if isinstance(row[name], dict):
+            row[name] = [(str(k), None if v is None else str(v)) for k, v in row[name].items()]
+    extra = {k: v for k, v in result.items() if k not in fields}
+    row["extra"] = json.dumps(extra) if extra else None
+    return row
+
+class ParquetSink(ResultSink):
+    """
+    Writes results into a directory of Parquet segments plus a URL/domain index.
+    Results are collected in memory and written as one segment when segment_rows is reached,
+    flush_interval has passed, or the sink is closed; a crash loses at most the unwritten rows.
+    Args:
+        path (str): Output directory (created if needed).
+        max_buffer (int): Max results waiting to be written.
+        segment_rows (int): Rows per segment file.
+        flush_interval (float): Max seconds before collected rows are written anyway.
+        row_group_rows (int): Rows per Parquet row group (the unit readers can skip).
+        compression (str): Parquet codec.
+        append (bool): Add segments to the ones already there (resumed crawl) instead of removing them first.
+    """
+    def __init__(self, path: str = "crawl_results", max_buffer: int = 100, segment_rows: int = 10_000,
+                 flush_interval: float = 60.0, row_group_rows: int = 1_000, compression: str = "zstd",
+                 append: bool = False):
+        super().__init__(max_buffer)
+        self.path = path
+        self.append = append
+        self.segment_rows = segment_rows
+        self.flush_interval = flush_interval
+        self.row_group_rows = row_group_rows
+        self.compression = compression
+        self.segments = 0
+        self._rows: List[Dict] = []
+        self._conn: Optional[sqlite3.Connection] = None
+        self._last_flush = time.monotonic()
+        self._next_segment = 0
+
+    def _open(self):
+        self._pa, self._pq = _pyarrow()
+        self._schema = result_schema(self._pa)
+        self._fields = set(self._schema.names) - {"domain", "crawled_at", "extra"}
+        os.makedirs(self.path, exist_ok=True)
+        if not self.append:
+            # Fresh crawl: drop the previous run's segments and index (only files this sink writes)
+            for name in os.listdir(self.path):
+                if name.startswith(SEGMENT_PREFIX) or name.startswith(INDEX_FILE):
+                    os.remove(os.path.join(self.path, name))
+        existing = [name for name in os.listdir(self.path)
+                    if name.startswith(SEGMENT_PREFIX) and name.endswith(".parquet")]
+        self._next_segment = max((int(name[len(SEGMENT_PREFIX):-8]) for name in existing), default=-1) + 1
+        self._conn = sqlite3.connect(os.path.join(self.path, INDEX_FILE), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(INDEX_SCHEMA)
+        self._conn.commit()
+        self._last_flush = time.monotonic()
+
+    def _write_batch(self, batch: List[Dict]):
+        now = time.time()
+        for result in batch:
+            self._rows.append(_row(result, now, self._fields))
+            # Roll over mid-batch, so no segment holds more than segment_rows rows
+            if len(self._rows) >= self.segment_rows:
+                self._flush()
+        if self._rows and time.monotonic() - self._last_flush >= self.flush_interval:
+            self._flush()
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        if not self._rows:
+            return
+        rows, self._rows = sorted(self._rows, key=lambda r: (r["domain"], r["url"] or "")), []
+        table = self._pa.Table.from_pylist(rows, schema=self._schema)
+        name = f"{SEGMENT_PREFIX}{self._next_segment:06d}.parquet"
+        self._next_segment += 1
+        target = os.path.join(self.path, name)
+        # Written under a temporary name: readers never see a half-written segment
+        self._pq.write_table(table, target + ".tmp", compression=self.compression,
+                             row_group_size=self.row_group_rows)
+        os.replace(target + ".tmp", target)
+        self._conn.executemany("INSERT INTO pages (url, domain, segment, row, crawled) VALUES (?, ?, ?, ?, ?)",
+                               [(r["url"], r["domain"], name, i, r["crawled_at"] / 1000) for i, r in enumerate(rows)])
+        self._conn.commit()
+        self.segments += 1
+
+    def _close(self):
+        if self._conn is None:
+            return
+        self._flush()
+        self._conn.close()
+        self._conn = None
+
+class ResultsStore:
+    """
+    Reader for a ParquetSink directory.
+    Usage:
+        store = ResultsStore("crawl_results")
+        table = store.read(columns=["url", "title", "word_count"], domain="example.com")
+        df = table.to_pandas()
+    Args:
+        path (str): Directory written by ParquetSink.
+    """
+    def __init__(self, path: str = "crawl_results"):
+        self.path = path
+        self._pa, self._pq = _pyarrow()
+        self._conn = sqlite3.connect(f"file:{os.path.join(path, INDEX_FILE)}?mode=ro", uri=True)
+
+    def domains(self) -> Dict[str, int]:
+        """
+        Distinct URLs stored per domain.
+        """
+        return dict(self._conn.execute("SELECT domain, COUNT(DISTINCT url) FROM pages GROUP BY domain ORDER BY domain"))
+
+    def urls(self, domain: Optional[str] = None) -> List[str]:
+        """
+        Stored URLs, optionally only those of one domain.
+        """
+        if domain is None:
+            return [url for url, in self._conn.execute("SELECT DISTINCT url FROM pages ORDER BY url")]
+        return [url for url, in self._conn.execute("SELECT DISTINCT url FROM pages WHERE domain = ? ORDER BY url",
+                                                    (domain.lower(),))]
+
+    def _locate(self, domain: Optional[str], urls: Optional[Iterable[str]]) -> Dict[str, List[int]]:
+        # Latest copy of every matching URL: segment -> rows
+        query = "SELECT url, segment, row, crawled FROM pages"
+        if urls is not None:
+            urls = list(urls)
+            matches = []
+            for start in range(0, len(urls), 500):
+                chunk = urls[start:start + 500]
+                matches += self._conn.execute(f"{query} WHERE url IN ({', '.join('?' * len(chunk))})", chunk).fetchall()
+            if domain is not None:
+                keep = set(self.urls(domain))
+                matches = [m for m in matches if m[0] in keep]
+        elif domain is not None:
+            matches = self._conn.execute(f"{query} WHERE domain = ?", (domain.lower(),)).fetchall()
+        else:
+            matches = self._conn.execute(query).fetchall()
+        latest = {}
+        for url, segment, row, crawled in matches:
+            if url not in latest or crawled >= latest[url][2]:
+                latest[url] = (segment, row, crawled)
+        located = defaultdict(list)
+        for segment, row, _ in latest.values():
+            located[segment].append(row)
+        return located
+
+    def read(self, columns: Optional[List[str]] = None, domain: Optional[str] = None,
+             urls: Optional[Iterable[str]] = None):
+        """
+        Loads stored results as a pyarrow Table.
+        Only the requested columns are decoded, and only the row groups that hold matching rows.
+        Args:
+            columns (list): Columns to load (None for all), see result_schema().
+            domain (str): Only pages of this domain.
+            urls (iterable): Only these URLs.
+        Returns:
+            pyarrow.Table: Matching results (the latest copy of each URL).
+        """
+        tables = []
+        for segment, rows in sorted(self._locate(domain, urls).items()):
+            parquet = self._pq.ParquetFile(os.path.join(self.path, segment))
+            starts = [0]
+            for group in range(parquet.num_row_groups):
+                starts.append(starts[-1] + parquet.metadata.row_group(group).num_rows)
+            rows = sorted(rows)
+            row_groups = [bisect_right(starts, row) - 1 for row in rows]
+            groups = sorted(set(row_groups))
+            table = parquet.read_row_groups(groups, columns=columns)
+            # Row numbers are per segment; shift them to their place among the row groups that were read
+            offsets, position = {}, 0
+            for group in groups:
+                offsets[group] = position
+                position += starts[group + 1] - starts[group]
+            tables.append(table.take([offsets[group] + row - starts[group] for row, group in zip(rows, row_groups)]))
+        if not tables:
+            schema = result_schema(self._pa)
+            return schema.empty_table().select(columns) if columns else schema.empty_table()
+        return self._pa.concat_tables(tables)
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,155 @@
+# Retry scheduling for failed fetches
+# - Classifies failures: connect/SOCKS, timeout, network, 5xx, 429/503 with Retry-After, permanent 4xx
+# - Exponential backoff with full jitter, Retry-After honoured (capped)
+# - Remembers where a URL failed, so the retry goes out on a different proxy/circuit
+# - crawl() re-queues the URL on the frontier after the delay; no worker sleeps or holds a slot meanwhile
+
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import httpx
+
+# Failure kinds and whether they are worth another attempt
+CONNECT = "connect"            # Proxy unreachable / SOCKS handshake or CONNECT refused
+TIMEOUT = "timeout"            # Connect/read/write/pool timeout, HTTP 408
+NETWORK = "network"            # Connection dropped mid-request, protocol errors
+SERVER = "server"              # HTTP 5xx
+RATE_LIMITED = "rate_limited"  # HTTP 429, or 503 with Retry-After
+CLIENT = "client"              # Other HTTP 4xx: the URL itself is bad
+RENDER = "render"              # Selenium could not load/extract the page
+REJECTED = "rejected"          # Not HTML, or over the size budget: refetching would not change that
+OTHER = "other"                # Anything unexpected (bugs, parse errors)
+RETRYABLE = {CONNECT, TIMEOUT, NETWORK, SERVER, RATE_LIMITED, RENDER}
+
+class FetchError(Exception):
+    """
+    A classified fetch failure.
+    Args:
+        kind (str): One of the failure kinds above.
+        message (str): Human readable cause.
+        status (int): HTTP status, if there was a response.
+        retry_after (float): Seconds the server asked us to wait (Retry-After), if any.
+    """
+    def __init__(self, kind: str, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.kind = kind
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.kind in RETRYABLE
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parses a Retry-After header (delta seconds or an HTTP date) into seconds from now.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+def classify(error: BaseException) -> FetchError:
+    """
+    Maps an exception raised while fetching to a FetchError.
+    """
+    if isinstance(error, FetchError):
+        return error
+    if isinstance(error, httpx.HTTPStatusError):
+        response = error.response
+        status = response.status_code
+        retry_after = parse_retry_after(response.headers.get("retry-after"))
+        if status == 429 or (status == 503 and retry_after is not None):
+            kind = RATE_LIMITED
+        elif status == 408:
+            kind = TIMEOUT
+        elif status >= 500:
+            kind = SERVER
+        else:
+            kind = CLIENT
+        return FetchError(kind, f"HTTP {status}", status, retry_after)
+    if isinstance(error, httpx.TimeoutException):
+        return FetchError(TIMEOUT, f"{type(error).__name__}: {error}")
+    if isinstance(error, (httpx.ProxyError, httpx.ConnectError, httpx.UnsupportedProtocol)):
+        return FetchError(CONNECT, f"{type(error).__name__}: {error}")
+    if isinstance(error, httpx.TransportError):
+        return FetchError(NETWORK, f"{type(error).__name__}: {error}")
+    if type(error).__module__.split(".")[0] == "socksio":
+        # httpx lets SOCKS handshake errors through unwrapped (e.g. the proxy refused the CONNECT)
+        return FetchError(CONNECT, f"SOCKS {type(error).__name__}: {error}")
+    return FetchError(OTHER, f"{type(error).__name__}: {error}")
+
+class RetryState:
+    def __init__(self):
+        self.attempts = 0
+        self.proxy: Optional[str] = None
+        self.circuit = None
+        self.kind: Optional[str] = None
+
+class RetryPolicy:
+    """
+    Decides whether and when a failed URL is tried again, and remembers where it failed.
+    Args:
+        max_retries (int): Retries per URL after the first attempt.
+        base_delay (float): Backoff of the first retry (seconds); doubles with every attempt.
+        max_delay (float): Cap on the backoff.
+        max_retry_after (float): Cap on a server's Retry-After; longer waits give up on the URL.
+    """
+    def __init__(self, max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 60.0,
+                 max_retry_after: float = 300.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self._states: Dict[str, RetryState] = {}
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Full-jitter exponential backoff: uniform(0, min(max_delay, base_delay * 2^attempt)).
+        A Retry-After from the server is a lower bound.
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after + random.uniform(0, self.base_delay))
+        return delay
+
+    def schedule(self, url: str, error: FetchError, proxy: Optional[str] = None, circuit=None) -> Optional[float]:
+        """
+        Records a failed attempt.
+        Args:
+            url (str): URL that failed.
+            error (FetchError): Classified failure.
+            proxy (str): Proxy the attempt used (the retry avoids it if there is another one).
+            circuit (Circuit): Circuit the attempt used.
+        Returns:
+            float or None: Seconds to wait before re-queueing the URL, or None to give up on it.
+        """
+        state = self._states.setdefault(url, RetryState())
+        state.attempts += 1
+        state.proxy, state.circuit, state.kind = proxy, circuit, error.kind
+        if not error.retryable or state.attempts > self.max_retries:
+            self._states.pop(url, None)
+            return None
+        if error.retry_after is not None and error.retry_after > self.max_retry_after:
+            self._states.pop(url, None)
+            return None
+        return self.backoff(state.attempts - 1, error.retry_after)
+
+    def state(self, url: str) -> Optional[RetryState]:
+        """
+        The URL's retry state, or None on a first attempt.
+        """
+        return self._states.get(url)
+
+    def forget(self, url: str):
+        """
+        Drops the state of a URL that has finished (fetched, or given up).
+        """
+        self._states.pop(url, None)
@@ -0,0 +1,150 @@
+# Streaming result sinks
+# - Results are written as soon as they are produced instead of being held until the crawl ends
+# - A bounded buffer applies backpressure: workers wait on write() when the writer falls behind
+# - Ships with a JSON Lines file sink and a stdout sink
+# - A columnar Parquet store with a URL/domain index lives in results_store.py (needs pyarrow)
+
+import asyncio
+import json
+import sys
+from typing import Dict, List, Optional
+
+_STOP = object()  # Queued by close(): the writer flushes what is left and exits
+
+class ResultSink:
+    """
+    Base class for result sinks. Buffers up to max_buffer results and drains them from a
+    background task in batches. Subclasses implement _write_batch() (called in a worker
+    thread) and optionally _open()/_close().
+    Usage:
+        async with JsonLinesSink("out.jsonl") as sink:
+            await sink.write(result)
+    Args:
+        max_buffer (int): Max results waiting to be written before write() blocks.
+    """
+    def __init__(self, max_buffer: int = 100):
+        self.max_buffer = max_buffer
+        self.count = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """
+        Opens the sink and starts the background writer.
+        """
+        await asyncio.to_thread(self._open)
+        self._queue = asyncio.Queue(maxsize=self.max_buffer)
+        self._task = asyncio.create_task(self._drain())
+
+    async def write(self, result: Dict):
+        """
+        Queues a result for writing. Blocks while the buffer is full (backpressure).
+        """
+        if result is None:
+            raise ValueError("Cannot write None to a result sink")
+        if self._task is None:
+            raise RuntimeError("Sink not started")
+        if self._task.done():
+            # Surface writer failures to the producer instead of blocking forever
+            self._task.result()
+        await self._queue.put(result)
+
+    async def _drain(self):
+        while True:
+            item = await self._queue.get()
+            batch = [item]
+            while not self._queue.empty() and len(batch) < self.max_buffer:
+                batch.append(self._queue.get_nowait())
+            stop = batch[-1] is _STOP
+            if stop:
+                batch.pop()
+            if batch:
+                await asyncio.to_thread(self._write_batch, batch)
+                self.count += len(batch)
+            if stop:
+                return
+
+    async def close(self):
+        """
+        Flushes everything still buffered and closes the sink.
+        """
+        if self._task is not None:
+            if not self._task.done():
+                await self._queue.put(_STOP)
+            task, self._task = self._task, None
+            await task
+        await asyncio.to_thread(self._close)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _open(self):
+        pass
+
+    def _write_batch(self, batch: List[Dict]):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+class JsonLinesSink(ResultSink):
+    """
+    Writes one JSON object per line to a file and flushes after every batch,
+    so a crash loses at most the results still in the buffer.
+    Args:
+        path (str): Output file path.
+        max_buffer (int): Max results waiting to be written.
+        append (bool): Keep the file's existing results (resumed crawl) instead of starting it over.
+    """
+    def __init__(self, path: str = "crawl_results.jsonl", max_buffer: int = 100, append: bool = False):
+        super().__init__(max_buffer)
+        self.path = path
+        self.append = append
+        self._file = None
+
+    def _open(self):
+        self._file = open(self.path, 'a' if self.append else 'w', encoding='utf-8')
+
+    def _write_batch(self, batch: List[Dict]):
+        self._file.write("".join(json.dumps(result) + "\n" for result in batch))
+        self._file.flush()
+
+    def _close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+class StdoutSink(ResultSink):
+    """
+    Prints one JSON object per line to stdout (handy for piping into jq).
+    """
+    def __init__(self, max_buffer: int = 100):
+        super().__init__(max_buffer)
+        self.path = "<stdout>"
+
+    def _write_batch(self, batch: List[Dict]):
+        sys.stdout.write("".join(json.dumps(result) + "\n" for result in batch))
+        sys.stdout.flush()
+
+def create_sink(kind: str = "jsonl", path: str = "crawl_results.jsonl", max_buffer: int = 100,
+                append: bool = False) -> ResultSink:
+    """
+    Builds a sink by name.
+    Args:
+        kind (str): "jsonl", "parquet" or "stdout".
+        path (str): Output path for file based sinks (a directory for "parquet").
+        max_buffer (int): Max results waiting to be written.
+        append (bool): File based sinks keep earlier results (resumed crawl); otherwise they start empty.
+    """
+    if kind == "jsonl":
+        return JsonLinesSink(path, max_buffer, append)
+    if kind == "parquet":
+        from results_store import ParquetSink  # pyarrow is only needed by this sink
+        return ParquetSink(path, max_buffer, append=append)
+    if kind == "stdout":
+        return StdoutSink(max_buffer)
+    raise ValueError(f"Unknown result sink: {kind}")
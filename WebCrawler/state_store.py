@@ -0,0 +1,196 @@
+# Crawl state persisted on disk for checkpoint/resume
+# - SQLite in WAL mode: readers never block the writer and commits are cheap
+# - Tracks every URL as pending / in_flight / done / failed with retry counts, plus per-host counters
+# - Updates are buffered and committed in batches from a worker thread, off the event loop
+# - A restarted crawl() re-queues pending and in-flight URLs and skips pages that are already done
+# - Runs are recorded too: only a run that stopped before its frontier drained is resumed
+
+import asyncio
+import sqlite3
+import threading
+import time
+from typing import Iterator, List, Optional, Tuple
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url      TEXT PRIMARY KEY,
+    depth    INTEGER NOT NULL,
+    status   TEXT NOT NULL,
+    retries  INTEGER NOT NULL DEFAULT 0,
+    error    TEXT,
+    updated  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS urls_status ON urls(status);
+CREATE TABLE IF NOT EXISTS hosts (
+    host      TEXT PRIMARY KEY,
+    requests  INTEGER NOT NULL DEFAULT 0,
+    failures  INTEGER NOT NULL DEFAULT 0,
+    last_seen REAL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    started  REAL NOT NULL,
+    finished REAL
+);
+"""
+
+class StateStore:
+    """
+    SQLite backed crawl state with batched commits.
+    Args:
+        path (str): Database file.
+        batch_size (int): Buffered updates that trigger a commit.
+        flush_interval (float): Max seconds between commits while the crawl is running.
+    """
+    def __init__(self, path: str = "crawl_state.db", batch_size: int = 100, flush_interval: float = 5.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._conn: Optional[sqlite3.Connection] = None
+        self._ops: List[Tuple[str, tuple]] = []
+        self._db_lock = threading.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._pending_flush: Optional[asyncio.Task] = None
+
+    def open(self):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def reset(self):
+        """
+        Forgets all state (fresh crawl).
+        """
+        with self._db_lock:
+            self._conn.execute("DELETE FROM urls")
+            self._conn.execute("DELETE FROM hosts")
+            self._conn.commit()
+
+    def interrupted(self) -> bool:
+        """
+        Whether the last run stopped before it finished (only then is there anything to resume).
+        """
+        with self._db_lock:
+            row = self._conn.execute("SELECT finished FROM runs ORDER BY id DESC LIMIT 1").fetchone()
+            if row is not None:
+                return row[0] is None
+            # State written before runs were recorded: unfinished if anything is still queued
+            return self._conn.execute("SELECT 1 FROM urls WHERE status IN (?, ?) LIMIT 1",
+                                      (PENDING, IN_FLIGHT)).fetchone() is not None
+
+    def begin_run(self):
+        with self._db_lock:
+            self._conn.execute("INSERT INTO runs (started) VALUES (?)", (time.time(),))
+            self._conn.commit()
+
+    def _finish_run(self):
+        with self._db_lock:
+            self._conn.execute("UPDATE runs SET finished = ? WHERE id = (SELECT MAX(id) FROM runs)", (time.time(),))
+            self._conn.commit()
+
+    async def finish_run(self):
+        """
+        Marks the current run as complete (its frontier drained), so the next crawl starts fresh.
+        """
+        await self.flush()
+        await asyncio.to_thread(self._finish_run)
+
+    def resume(self) -> Tuple[Iterator[str], List[Tuple[str, int]], int]:
+        """
+        Loads the state of a previous run. In-flight URLs were interrupted, so they count as pending.
+        Returns:
+            tuple: (iterator over done URLs, list of (url, depth) to re-queue, number of done URLs)
+        """
+        with self._db_lock:
+            self._conn.execute("UPDATE urls SET status = ? WHERE status = ?", (PENDING, IN_FLIGHT))
+            self._conn.commit()
+            pending = self._conn.execute("SELECT url, depth FROM urls WHERE status = ? ORDER BY depth",
+                                         (PENDING,)).fetchall()
+            done_count = self._conn.execute("SELECT COUNT(*) FROM urls WHERE status IN (?, ?)",
+                                            (DONE, FAILED)).fetchone()[0]
+        # Finished URLs are streamed, there can be millions of them
+        done = (row[0] for row in self._conn.execute("SELECT url FROM urls WHERE status IN (?, ?)", (DONE, FAILED)))
+        return done, pending, done_count
+
+    def _queue(self, sql: str, params: tuple):
+        self._ops.append((sql, params))
+        if len(self._ops) >= self.batch_size and (self._pending_flush is None or self._pending_flush.done()):
+            self._pending_flush = asyncio.get_running_loop().create_task(self.flush())
+
+    def mark_pending(self, url: str, depth: int):
+        self._queue("INSERT OR IGNORE INTO urls (url, depth, status, updated) VALUES (?, ?, ?, ?)",
+                    (url, depth, PENDING, time.time()))
+
+    def mark_in_flight(self, url: str):
+        self._queue("UPDATE urls SET status = ?, updated = ? WHERE url = ?", (IN_FLIGHT, time.time(), url))
+
+    def mark_done(self, url: str):
+        self._queue("UPDATE urls SET status = ?, error = NULL, updated = ? WHERE url = ?", (DONE, time.time(), url))
+
+    def mark_retry(self, url: str, error: Optional[str] = None):
+        """
+        A failed attempt that will be retried: back to pending, so a restart picks it up too.
+        """
+        self._queue("UPDATE urls SET status = ?, retries = retries + 1, error = ?, updated = ? WHERE url = ?",
+                    (PENDING, error, time.time(), url))
+
+    def mark_failed(self, url: str, error: Optional[str] = None):
+        self._queue("UPDATE urls SET status = ?, retries = retries + 1, error = ?, updated = ? WHERE url = ?",
+                    (FAILED, error, time.time(), url))
+
+    def record_host(self, host: str, ok: bool):
+        self._queue("INSERT INTO hosts (host, requests, failures, last_seen) VALUES (?, 1, ?, ?) "
+                    "ON CONFLICT(host) DO UPDATE SET requests = requests + 1, "
+                    "failures = failures + excluded.failures, last_seen = excluded.last_seen",
+                    (host, 0 if ok else 1, time.time()))
+
+    def _commit(self, ops: List[Tuple[str, tuple]]):
+        with self._db_lock:
+            with self._conn:
+                for sql, params in ops:
+                    self._conn.execute(sql, params)
+
+    async def flush(self):
+        """
+        Commits all buffered updates in one transaction. Flushes run one at a time, in order.
+        """
+        async with self._flush_lock:
+            ops, self._ops = self._ops, []
+            if ops:
+                await asyncio.to_thread(self._commit, ops)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def start(self):
+        await asyncio.to_thread(self.open)
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        if self._pending_flush is not None:
+            await asyncio.gather(self._pending_flush, return_exceptions=True)
+        await self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -0,0 +1,72 @@
+# Bounded streaming downloads
+# - Content-Type and Content-Length are checked from the headers, before any of the body is read
+# - The body is streamed against a per-response byte budget; the download stops as soon as it is exceeded
+# - Responses without a Content-Type are sniffed (binary data is rejected after the first chunk)
+# - Bandwidth and memory per request are bounded by the budget, whatever the server sends
+
+from typing import Iterable, Optional, Tuple
+
+import httpx
+
+from retry import REJECTED, FetchError
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+def check_headers(response: httpx.Response, content_types: Optional[Iterable[str]] = HTML_CONTENT_TYPES,
+                  max_bytes: Optional[int] = None, truncate: bool = False):
+    """
+    Rejects a response from its headers alone.
+    Args:
+        response (httpx.Response): Streamed response, body not read yet.
+        content_types (iterable): Accepted media types (None accepts anything).
+        max_bytes (int): Byte budget; a larger Content-Length is rejected (unless truncate).
+        truncate (bool): Oversized bodies are cut at the budget instead of rejected.
+    Raises:
+        FetchError: REJECTED, with the reason.
+    """
+    content_type = response.headers.get("content-type", "").split(";", 1)[0].strip().lower()
+    if content_types is not None and content_type and content_type not in content_types:
+        raise FetchError(REJECTED, f"content type {content_type}", response.status_code)
+    length = response.headers.get("content-length")
+    if max_bytes is not None and not truncate and length and length.isdigit() and int(length) > max_bytes:
+        raise FetchError(REJECTED, f"content length {length} over {max_bytes} bytes", response.status_code)
+
+def _looks_binary(chunk: bytes) -> bool:
+    return b"\x00" in chunk[:1024]
+
+async def read_body(response: httpx.Response, max_bytes: Optional[int] = None, truncate: bool = False,
+                    sniff: bool = True) -> Tuple[bytes, bool]:
+    """
+    Streams the (decompressed) body up to the byte budget.
+    Args:
+        response (httpx.Response): Streamed response.
+        max_bytes (int): Byte budget (None for no limit).
+        truncate (bool): Stop at the budget and keep what arrived instead of rejecting the response.
+        sniff (bool): Reject binary content when the server sent no Content-Type.
+    Returns:
+        tuple: (body, truncated)
+    Raises:
+        FetchError: REJECTED when the body turns out binary or exceeds the budget.
+    """
+    body = bytearray()
+    sniff = sniff and "content-type" not in response.headers
+    async for chunk in response.aiter_bytes():
+        if sniff:
+            if _looks_binary(chunk):
+                raise FetchError(REJECTED, "binary content without a content type", response.status_code)
+            sniff = False
+        body += chunk
+        if max_bytes is not None and len(body) > max_bytes:
+            if not truncate:
+                raise FetchError(REJECTED, f"body over {max_bytes} bytes", response.status_code)
+            # Leaving the stream early closes the connection, the rest is never downloaded
+            return bytes(body[:max_bytes]), True
+    return bytes(body), False
+
+async def fetch_body(response: httpx.Response, content_types: Optional[Iterable[str]] = HTML_CONTENT_TYPES,
+                     max_bytes: Optional[int] = None, truncate: bool = False) -> Tuple[bytes, bool]:
+    """
+    check_headers() followed by read_body().
+    """
+    check_headers(response, content_types, max_bytes, truncate)
+    return await read_body(response, max_bytes, truncate)
@@ -0,0 +1,95 @@
+# Proxy harvester checks against local fixture pages (no network)
+# - parse_proxies on a free-proxy-list table, a geonode JSON response and a plain ip:port list
+# - harvest() over a local HTTP server: concurrent sources, dedup, cache file
+# - get(): a fresh cache skips the sources, an expired one is refreshed, and a stale one is used if every source fails
+# Run with: py -m pytest test_proxy_harvest.py
+
+import asyncio
+import json
+import os
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from proxy_harvest import ProxyHarvester, ProxySource, parse_proxies
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "proxies")
+
+def fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def fixture_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=FIXTURES))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+def sources(base: str):
+    return [ProxySource("table", f"{base}/free_proxy_list.html"),
+            ProxySource("json", f"{base}/geonode.json"),
+            ProxySource("plain", f"{base}/socks5.txt", "socks5")]
+
+def test_parse_table():
+    entries = parse_proxies(fixture("free_proxy_list.html"), ProxySource("table", "http://fixture/"))
+    assert entries == [{"url": "http://1.2.3.4:8080", "https": True, "source": "table"},
+                       {"url": "http://5.6.7.8:3128", "https": False, "source": "table"}]
+
+def test_parse_json():
+    entries = parse_proxies(fixture("geonode.json"), ProxySource("json", "http://fixture/"))
+    assert entries == [{"url": "socks5://9.9.9.9:1080", "https": True, "source": "json"},
+                       {"url": "http://1.2.3.4:8080", "https": False, "source": "json"}]
+
+def test_parse_plain_list_rejects_bad_ports():
+    entries = parse_proxies(fixture("socks5.txt"), ProxySource("plain", "http://fixture/", "socks5"))
+    assert [e["url"] for e in entries] == ["socks5://11.11.11.11:1080", "socks5://13.13.13.13:4145"]
+    assert all(e["https"] for e in entries)
+
+def test_harvest_dedupes_and_caches(fixture_server, tmp_path):
+    cache = tmp_path / "proxies.json"
+    harvester = ProxyHarvester(sources(fixture_server), str(cache), protocols=("http", "socks5"), https_only=False)
+    entries = asyncio.run(harvester.harvest())
+    urls = sorted(e["url"] for e in entries)
+    assert urls == ["http://1.2.3.4:8080", "http://5.6.7.8:3128", "socks5://11.11.11.11:1080",
+                    "socks5://13.13.13.13:4145", "socks5://9.9.9.9:1080"]
+    # Listed by two sources, https by one of them
+    assert next(e for e in entries if e["url"] == "http://1.2.3.4:8080")["https"]
+    assert sorted(e["url"] for e in json.loads(cache.read_text())["proxies"]) == urls
+
+def test_https_only_filter(fixture_server, tmp_path):
+    harvester = ProxyHarvester(sources(fixture_server), str(tmp_path / "proxies.json"))
+    assert "http://5.6.7.8:3128" not in harvester.get_sync()
+
+def write_cache(path, proxies, age: float):
+    entries = [{"url": url, "https": True, "source": "cached"} for url in proxies]
+    path.write_text(json.dumps({"created": time.time() - age, "proxies": entries}))
+
+def test_fresh_cache_skips_sources(tmp_path):
+    cache = tmp_path / "proxies.json"
+    write_cache(cache, ["socks5://1.1.1.1:1080"], age=10)
+    # Nothing listens on port 9: any request would fail
+    harvester = ProxyHarvester([ProxySource("down", "http://127.0.0.1:9/")], str(cache), ttl=60, timeout=2)
+    assert harvester.get_sync() == ["socks5://1.1.1.1:1080"]
+
+def test_expired_cache_is_refreshed(fixture_server, tmp_path):
+    cache = tmp_path / "proxies.json"
+    write_cache(cache, ["socks5://1.1.1.1:1080"], age=120)
+    harvester = ProxyHarvester(sources(fixture_server), str(cache), ttl=60)
+    proxies = harvester.get_sync()
+    assert "socks5://1.1.1.1:1080" not in proxies
+    assert "socks5://9.9.9.9:1080" in proxies
+
+def test_stale_cache_when_sources_fail(tmp_path):
+    cache = tmp_path / "proxies.json"
+    write_cache(cache, ["socks5://1.1.1.1:1080"], age=120)
+    harvester = ProxyHarvester([ProxySource("down", "http://127.0.0.1:9/")], str(cache), ttl=60, timeout=2)
+    assert harvester.get_sync() == ["socks5://1.1.1.1:1080"]